@@ -1,16 +1,42 @@
+import asyncio
 import json
 import os
 import subprocess
-import threading
 import uuid
-from typing import Dict
-from fastapi import BackgroundTasks, FastAPI, HTTPException
-from nuclei_html_report import convert_nuclei_to_html
+from typing import Dict, Optional
+from fastapi import FastAPI, HTTPException, Query, Request
+from fastapi.responses import StreamingResponse
+from nuclei_html_report import NucleiReportFollower
+from scan_store import MAX_PAGE_SIZE, TERMINAL, ScanStore
+from scheduler import DEFAULT_PRIORITY, Job, ScanScheduler
+from tool_output import OutputHub
 
 app = FastAPI(title="Parallel Security Scanner")
 
-# In-memory tracking for scan statuses.
-scans_db: Dict[str, dict] = {}
+# Durable scan and tool statuses (SQLite, survives restarts).
+store = ScanStore()
+
+# Tool runs are queued here and started as worker / per-tool slots free up.
+scheduler = ScanScheduler()
+
+# Live tool output (bounded per tool) and status events for /scan/stream.
+output_hub = OutputHub()
+STREAM_KEEPALIVE = 15  # seconds between SSE keep-alive comments
+
+@app.on_event("startup")
+def start_scheduler() -> None:
+    """Requeue jobs that were waiting or running when the server stopped, then start dispatching."""
+    pending = store.recover()
+    for row in pending:
+        commands = build_tool_commands(row["target"], row["scan_id"], row["model_name"])
+        queue_tool(row["scan_id"], row["tool"], commands[row["tool"]], row["target"], row["priority"])
+    if pending:
+        print(f"[scheduler] Recovered {len(pending)} queued tool run(s) from the scan store")
+    scheduler.start()
+
+@app.on_event("shutdown")
+def stop_scheduler() -> None:
+    scheduler.stop()
 
 # --- Configuration ---
 DEFAULT_TARGET = "http://testphp.vulnweb.com"
@@ -24,102 +50,78 @@ def get_host_reports_path() -> str:
     return raw_path
 
 HOST_REPORTS_PATH = get_host_reports_path()
+# The same reports directory as seen by this process (./reports is mounted into the container)
+LOCAL_REPORTS_PATH = os.path.join(os.getcwd(), "reports")
 
-def convert_nuclei_json_to_html(scan_id: str) -> None:
-    """
-    Convert Nuclei JSON report to HTML using pure Python.
-    Reads the JSON file and generates a formatted HTML report.
-    """
-    try:
-        print(f"[nuclei-html-converter] Starting conversion for scan {scan_id}...")
-        
-        # Build the file paths
-        json_file = os.path.join(HOST_REPORTS_PATH, f"nuclei_{scan_id}.json")
-        html_file = os.path.join(HOST_REPORTS_PATH, f"nuclei_{scan_id}.html")
-        
-        # Check if JSON file exists
-        if not os.path.exists(json_file):
-            print(f"[nuclei-html-converter] JSON file not found: {json_file}")
-            return
-        
-        # Read the JSON file
-        with open(json_file, 'r', encoding='utf-8') as f:
-            lines = f.readlines()
-        
-        # Parse JSON lines (Nuclei outputs newline-delimited JSON)
-        vulnerabilities = []
-        for line in lines:
-            line = line.strip()
-            if line:
-                try:
-                    vuln = json.loads(line)
-                    vulnerabilities.append(vuln)
-                except json.JSONDecodeError:
-                    continue
-        
-        # Generate HTML report from vulnerabilities
-        html_content = generate_nuclei_html_report(vulnerabilities, scan_id)
-        
-        # Write HTML file
-        with open(html_file, 'w', encoding='utf-8') as f:
-            f.write(html_content)
-        
-        print(f"[nuclei-html-converter] HTML report generated successfully: {html_file}")
-    
-    except Exception as exc:
-        print(f"[nuclei-html-converter] Error: {exc}")
+def set_tool_status(scan_id: str, tool_name: str, status: str, exit_code: Optional[int] = None) -> bool:
+    """Record a tool status change and push it to /scan/stream readers."""
+    scan_status = store.transition(scan_id, tool_name, status, exit_code)
+    if scan_status is None:
+        return False
+    output_hub.feed(scan_id).publish("status", {
+        "tool": tool_name, "status": status, "exit_code": exit_code, "scan_status": scan_status,
+    })
+    if scan_status in TERMINAL:
+        output_hub.finish(scan_id)
+    return True
 
 
 def run_tool_thread(tool_name: str, command: list, scan_id: str) -> None:
-    """Run a single tool and update its status in the scan database."""
-    scans_db[scan_id]["tools"][tool_name] = "in_progress"
+    """Run a single tool, streaming its output, and record its status in the scan store."""
+    if not set_tool_status(scan_id, tool_name, "in_progress"):
+        print(f"[{tool_name}] Scan {scan_id} is no longer queued for {tool_name}; skipping.")
+        return
 
+    status, exit_code = "failed", None
+    report = None
     try:
         print(f"[{tool_name}] Preparing to start...")
-        # Execute the tool command
-        result = subprocess.run(command, capture_output=True, text=True, check=False)
-
-        # Log standard output (truncated to avoid clutter)
-        if result.stdout:
-            print(f"[{tool_name}] STDOUT: {result.stdout[:500]}...")
-
-        # Log error output for debugging
-        if result.stderr:
-            print(f"[{tool_name}] STDERR:\n{result.stderr}")
+        if tool_name == "nuclei":
+            # Build this scan's HTML report while Nuclei runs; it is finalized once the process exits
+            report = NucleiReportFollower(
+                os.path.join(LOCAL_REPORTS_PATH, f"nuclei_{scan_id}.json"),
+                os.path.join(LOCAL_REPORTS_PATH, f"nuclei_{scan_id}.html"),
+                f"Nuclei Scan Report - {scan_id}",
+            )
+            report.start()
+        # Read output line by line into the tool's ring buffer instead of buffering all of it
+        process = subprocess.Popen(
+            command,
+            stdout=subprocess.PIPE,
+            stderr=subprocess.STDOUT,
+            text=True,
+            encoding="utf-8",
+            errors="replace",
+            bufsize=1,
+        )
+        with process.stdout:
+            output_hub.stream_lines(scan_id, tool_name, process.stdout)
+        exit_code = process.wait()
 
         # Handle tool completion status
-        if result.returncode != 0:
+        if exit_code != 0:
             # ZAP returns 2 for warnings; treat that as success.
-            if tool_name == "zap" and result.returncode == 2:
-                scans_db[scan_id]["tools"][tool_name] = "finished"
+            if tool_name == "zap" and exit_code == 2:
+                status = "finished"
             else:
-                print(f"!!! Error in {tool_name} (Exit Code {result.returncode}) !!!")
-                scans_db[scan_id]["tools"][tool_name] = "failed"
+                print(f"!!! Error in {tool_name} (Exit Code {exit_code}) !!!")
+                # Log the end of the output for debugging
+                last_lines = output_hub.feed(scan_id).tail(tool_name, 20)
+                print(f"[{tool_name}] Last output:\n" + "\n".join(last_lines))
         else:
             print(f"[{tool_name}] Finished successfully.")
-            scans_db[scan_id]["tools"][tool_name] = "finished"
-            
-            # After nuclei completes, convert its JSON output to HTML
-            if tool_name == "nuclei":
-                print("[nuclei] Triggering HTML report generation...")
-                convert_nuclei_to_html("./reports")
+            status = "finished"
 
     except Exception as exc:
         print(f"Critical Exception in {tool_name}: {exc}")
-        scans_db[scan_id]["tools"][tool_name] = "failed"
 
-    # Check if all tools are done and update overall scan status
-    update_overall_status(scan_id)
+    if report is not None:
+        summary = report.stop()
+        if summary is not None:
+            print(f"[nuclei] HTML report ready: {report.html_path} ({summary['total']} findings)")
 
-
-def update_overall_status(scan_id: str) -> None:
-    """Aggregate tool statuses into a single scan status."""
-    statuses = scans_db[scan_id]["tools"].values()
-    if "in_progress" not in statuses:
-        if "failed" in list(statuses):
-            scans_db[scan_id]["status"] = "finished_with_errors"
-        else:
-            scans_db[scan_id]["status"] = "completed"
+    # Record the tool result; the store recomputes the overall scan status atomically
+    set_tool_status(scan_id, tool_name, status, exit_code)
 
 
 def normalize_model_name(model_name: str) -> str:
@@ -175,45 +177,119 @@ def build_tool_commands(target: str, scan_id: str, model_name: str) -> Dict[str,
     }
 
 
-def start_parallel_scans(target: str, scan_id: str, model_info: dict) -> None:
-    """Kick off all tool scans in parallel threads."""
-    scans_db[scan_id]["status"] = "in_progress"
+def queue_tool(scan_id: str, tool: str, command: list, target: str, priority: int) -> None:
+    """Hand one tool run to the scheduler."""
+    scheduler.submit(Job(
+        scan_id=scan_id,
+        tool=tool,
+        target=target,
+        priority=priority,
+        run=lambda: run_tool_thread(tool, command, scan_id),
+    ))
+
 
+def start_parallel_scans(target: str, scan_id: str, model_info: dict, priority: int = DEFAULT_PRIORITY) -> None:
+    """Record the scan and queue one job per tool; the scheduler runs them in parallel as slots free up."""
     actual_model_name = normalize_model_name(model_info["name"])
     commands = build_tool_commands(target, scan_id, actual_model_name)
 
+    store.create_scan(scan_id, target, list(commands), priority, model_info["type"], actual_model_name)
     for tool, cmd in commands.items():
-        thread = threading.Thread(target=run_tool_thread, args=(tool, cmd, scan_id))
-        thread.start()
+        queue_tool(scan_id, tool, cmd, target, priority)
 
 @app.post("/scan/all")
-async def start_scan(
-    background_tasks: BackgroundTasks,
+def start_scan(
     target: str = DEFAULT_TARGET,
     model_type: str = DEFAULT_MODEL_TYPE,
     model_name: str = DEFAULT_MODEL_NAME,
+    priority: int = Query(DEFAULT_PRIORITY, ge=0, le=9, description="0 = most urgent"),
 ):
-    """Start a scan for all tools and return the scan ID."""
+    """Queue a scan for all tools and return the scan ID."""
     scan_id = str(uuid.uuid4())
-    scans_db[scan_id] = {
-        "target": target,
-        "status": "starting",
-        "tools": {} 
-    }
-    
     model_info = {"type": model_type, "name": model_name}
-    background_tasks.add_task(start_parallel_scans, target, scan_id, model_info)
+    start_parallel_scans(target, scan_id, model_info, priority)
     
-    return {"scan_id": scan_id, "status": "all_tools_triggered", "target": target}
+    return {
+        "scan_id": scan_id,
+        "status": "all_tools_triggered",
+        "target": target,
+        "queue_position": scheduler.queue_positions(scan_id),
+    }
 
 @app.get("/scan/status/{scan_id}")
-async def get_status(scan_id: str):
-    """Return the status of a single scan by ID."""
-    if scan_id not in scans_db:
+def get_status(scan_id: str):
+    """Return the status of a single scan by ID, with queue positions of its waiting tools."""
+    scan = store.get_scan(scan_id)
+    if scan is None:
         raise HTTPException(status_code=404, detail="Scan ID not found")
-    return scans_db[scan_id]
+    return {**scan, "queue_position": scheduler.queue_positions(scan_id)}
+
+def sse_event(kind: str, data: dict, seq: Optional[int] = None) -> str:
+    """Format one Server-Sent Event."""
+    event_id = f"id: {seq}\n" if seq is not None else ""
+    return f"{event_id}event: {kind}\ndata: {json.dumps(data)}\n\n"
+
+@app.get("/scan/stream/{scan_id}")
+async def stream_scan(scan_id: str, request: Request):
+    """
+    Push a scan's tool output ("log" events) and status changes ("status" events)
+    as Server-Sent Events until the scan is done. Reconnecting clients send
+    Last-Event-ID and get the buffered events they missed.
+    """
+    # Plain-def handlers run in the threadpool; this one is async, so move the sqlite read off the loop
+    scan = await asyncio.to_thread(store.get_scan, scan_id)
+    if scan is None:
+        raise HTTPException(status_code=404, detail="Scan ID not found")
+    try:
+        last_seen = int(request.headers.get("last-event-id", "0"))
+    except ValueError:
+        last_seen = 0
+    # Output of long-finished scans is no longer buffered
+    feed = output_hub.get(scan_id)
+    if feed is None and scan["status"] not in TERMINAL:
+        feed = output_hub.feed(scan_id)
+
+    async def events():
+        yield sse_event("scan", scan)
+        if feed is None:
+            yield sse_event("end", {"scan_status": scan["status"]})
+            return
+        wakeup = feed.subscribe()
+        seq, scan_status = last_seen, scan["status"]
+        try:
+            while True:
+                wakeup.clear()
+                for seq, kind, data in feed.since(seq):
+                    yield sse_event(kind, data, seq)
+                    if kind == "status":
+                        scan_status = data["scan_status"]
+                if scan_status in TERMINAL:
+                    yield sse_event("end", {"scan_status": scan_status})
+                    return
+                try:
+                    await asyncio.wait_for(wakeup.wait(), STREAM_KEEPALIVE)
+                except asyncio.TimeoutError:
+                    yield ": keep-alive\n\n"
+        finally:
+            feed.unsubscribe(wakeup)
+
+    return StreamingResponse(events(), media_type="text/event-stream", headers={"Cache-Control": "no-cache"})
+
+@app.get("/scheduler")
+async def get_scheduler():
+    """Return worker pool size, per-tool limits and running / queued jobs per tool."""
+    return scheduler.stats()
 
 @app.get("/scans")
-async def get_all_scans():
-    """Return all scans currently tracked in memory."""
-    return scans_db
\ No newline at end of file
+def get_all_scans(
+    status: Optional[str] = None,
+    target: Optional[str] = None,
+    limit: int = Query(50, ge=1, le=MAX_PAGE_SIZE),
+    cursor: Optional[str] = None,
+):
+    """Return scans newest first, optionally filtered; pass next_cursor back as cursor for the next page."""
+    try:
+        scans, next_cursor = store.list_scans(status=status, target=target, limit=limit, cursor=cursor)
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+    return {"scans": scans, "count": len(scans), "next_cursor": next_cursor}
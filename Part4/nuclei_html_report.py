@@ -1,81 +1,221 @@
+import html
 import json
 import os
 import re
+import threading
+from collections import Counter
+from typing import Optional, Tuple
 
-def convert_nuclei_to_html(HOST_REPORTS_PATH: str):
-    # חיפוש קובץ ה-JSON בתיקייה שמתחיל ב-nuclei ומסתיים ב-.json
-    json_filename = None
-    for filename in os.listdir(HOST_REPORTS_PATH):
-        if re.match(r'^nuclei.*\.json$', filename):
-            json_filename = filename
-            break
-            
-    if not json_filename:
-        print("[-] לא נמצא קובץ JSON של Nuclei בתיקייה.")
-        return
-
-    # הגדרת הנתיבים המלאים
-    json_path = os.path.join(HOST_REPORTS_PATH, json_filename)
-    html_filename = re.sub(r'\.json$', '.html', json_filename)
-    html_path = os.path.join(HOST_REPORTS_PATH, html_filename)
-
-    findings = []
-    with open(json_path, 'r', encoding='utf-8') as f:
+SEVERITIES = ("critical", "high", "medium", "low", "info", "unknown")
+TOP_TEMPLATES = 20  # templates listed in the summary
+WRITE_BUFFER = 1 << 16
+POLL_INTERVAL = 1.0  # seconds between reads of a growing Nuclei output file
+
+HEADER = """<!DOCTYPE html>
+<html lang="en">
+<head>
+    <meta charset="UTF-8">
+    <title>{title}</title>
+    <style>
+        body {{ font-family: Arial, sans-serif; margin: 20px; display: flex; flex-direction: column; }}
+        h2 {{ order: -2; }}
+        #summary {{ order: -1; }}
+        table {{ border-collapse: collapse; width: 100%; margin-top: 20px; }}
+        th, td {{ border: 1px solid #ddd; padding: 10px; text-align: left; }}
+        th {{ background-color: #333; color: white; }}
+        .critical {{ background-color: #ffcccc; }}
+        .high {{ background-color: #ffebcc; }}
+        .medium {{ background-color: #ffffcc; }}
+        .low {{ background-color: #e6ffcc; }}
+        .info {{ background-color: #e6f2ff; }}
+    </style>
+</head>
+<body>
+    <h2>{title}</h2>
+    <table>
+        <tr>
+            <th>Severity</th>
+            <th>Vulnerability Name</th>
+            <th>Target / URL</th>
+        </tr>
+"""
+
+ROW = """        <tr class="{severity}">
+            <td><strong>{label}</strong></td>
+            <td>{name}</td>
+            <td>{target}</td>
+        </tr>
+"""
+
+
+class NucleiHtmlReport:
+    """
+    Nuclei findings written to an HTML report as they arrive.
+
+    Each row goes straight to a buffered file; only severity and per-template
+    counts are kept, so memory stays flat however many findings there are.
+    close() writes the summary after the table (CSS shows it on top).
+    """
+
+    def __init__(self, html_path: str, title: str = "Nuclei Scan Report"):
+        self.html_path = html_path
+        self.total = 0
+        self.severities: Counter = Counter()
+        self.templates: Counter = Counter()  # (severity, template name) -> findings
+        self._file = open(html_path, "w", encoding="utf-8", buffering=WRITE_BUFFER)
+        self._file.write(HEADER.format(title=html.escape(title)))
+
+    def add_line(self, line: str) -> bool:
+        """Add one line of Nuclei JSONL output; blank or malformed lines are skipped."""
+        line = line.strip()
+        if not line:
+            return False
+        try:
+            finding = json.loads(line)
+        except json.JSONDecodeError:
+            return False
+        if not isinstance(finding, dict):
+            return False
+        self.add(finding)
+        return True
+
+    def add(self, finding: dict) -> None:
+        info = finding.get("info") or {}
+        severity = str(info.get("severity") or "info").lower()
+        if severity not in SEVERITIES:
+            severity = "unknown"
+        name = str(info.get("name") or finding.get("template-id") or "Unknown")
+        target = str(finding.get("host", finding.get("matched-at", "Unknown")))
+
+        self.total += 1
+        self.severities[severity] += 1
+        self.templates[(severity, name)] += 1
+        self._file.write(ROW.format(
+            severity=severity,
+            label=severity.upper(),
+            name=html.escape(name),
+            target=self._link(target),
+        ))
+
+    @staticmethod
+    def _link(target: str) -> str:
+        escaped = html.escape(target)
+        if target.startswith(("http://", "https://")):
+            return f'<a href="{escaped}" target="_blank">{escaped}</a>'
+        return escaped
+
+    def flush(self) -> None:
+        self._file.flush()
+
+    def summary(self) -> dict:
+        """Severity counts in severity order and the most frequent templates."""
+        rank = {severity: index for index, severity in enumerate(SEVERITIES)}
+        top = sorted(self.templates.items(), key=lambda item: (-item[1], rank[item[0][0]], item[0][1]))
+        return {
+            "total": self.total,
+            "severities": {severity: self.severities[severity] for severity in SEVERITIES if self.severities[severity]},
+            "top_templates": [
+                {"severity": severity, "name": name, "count": count}
+                for (severity, name), count in top[:TOP_TEMPLATES]
+            ],
+        }
+
+    def close(self) -> dict:
+        """Close the table, write the summary and the end of the document."""
+        summary = self.summary()
+        write = self._file.write
+        write("    </table>\n    <div id=\"summary\">\n")
+        write(f"        <p><strong>Total findings:</strong> {summary['total']}</p>\n")
+        write("        <table>\n            <tr><th>Severity</th><th>Findings</th></tr>\n")
+        for severity, count in summary["severities"].items():
+            write(f'            <tr class="{severity}"><td>{severity.upper()}</td><td>{count}</td></tr>\n')
+        write("        </table>\n")
+        if summary["top_templates"]:
+            write("        <table>\n            <tr><th>Severity</th><th>Top Templates</th><th>Findings</th></tr>\n")
+            for template in summary["top_templates"]:
+                write(f'            <tr class="{template["severity"]}"><td>{template["severity"].upper()}</td>'
+                      f'<td>{html.escape(template["name"])}</td><td>{template["count"]}</td></tr>\n')
+            write("        </table>\n")
+        write("    </div>\n</body>\n</html>\n")
+        self._file.close()
+        return summary
+
+    def __enter__(self) -> "NucleiHtmlReport":
+        return self
+
+    def __exit__(self, *exc) -> None:
+        if not self._file.closed:
+            self.close()
+
+
+def convert_nuclei_file(json_path: str, html_path: Optional[str] = None,
+                        title: str = "Nuclei Scan Report") -> Tuple[str, dict]:
+    """Stream a Nuclei JSONL file into an HTML report; returns (html_path, summary)."""
+    html_path = html_path or re.sub(r'\.json$', '', json_path) + '.html'
+    with open(json_path, 'r', encoding='utf-8', errors='replace') as f, NucleiHtmlReport(html_path, title) as report:
         for line in f:
-            if line.strip():
-                try:
-                    findings.append(json.loads(line))
-                except json.JSONDecodeError:
-                    continue
-
-    html_content = """
-    <!DOCTYPE html>
-    <html lang="en">
-    <head>
-        <meta charset="UTF-8">
-        <style>
-            body { font-family: Arial, sans-serif; margin: 20px; }
-            table { border-collapse: collapse; width: 100%; margin-top: 20px; }
-            th, td { border: 1px solid #ddd; padding: 10px; text-align: left; }
-            th { background-color: #333; color: white; }
-            .critical { background-color: #ffcccc; }
-            .high { background-color: #ffebcc; }
-            .medium { background-color: #ffffcc; }
-            .low { background-color: #e6ffcc; }
-            .info { background-color: #e6f2ff; }
-        </style>
-    </head>
-    <body>
-        <h2>Nuclei Scan Report</h2>
-        <table>
-            <tr>
-                <th>Severity</th>
-                <th>Vulnerability Name</th>
-                <th>Target / URL</th>
-            </tr>
+            report.add_line(line)
+        return html_path, report.close()
+
+
+class NucleiReportFollower:
     """
+    Build a scan's HTML report while Nuclei is still writing its JSONL file.
 
-    for item in findings:
-        info = item.get('info', {})
-        severity = info.get('severity', 'info').lower()
-        name = info.get('name', 'Unknown')
-        target = item.get('host', item.get('matched-at', 'Unknown'))
-
-        html_content += f"""
-            <tr class="{severity}">
-                <td><strong>{severity.upper()}</strong></td>
-                <td>{name}</td>
-                <td><a href="{target}" target="_blank">{target}</a></td>
-            </tr>
-        """
-
-    html_content += """
-        </table>
-    </body>
-    </html>
+    A background thread tails the JSON file and appends each complete line
+    to the report. stop() reads whatever is left and finalizes the HTML, so
+    the report is ready as soon as the tool exits.
     """
 
-    with open(html_path, 'w', encoding='utf-8') as f:
-        f.write(html_content)
-        
-    print(f"[+] הקובץ הומר ונשמר בהצלחה: {html_path}")
\ No newline at end of file
+    def __init__(self, json_path: str, html_path: str, title: str = "Nuclei Scan Report",
+                 poll_interval: float = POLL_INTERVAL):
+        self.json_path = json_path
+        self.html_path = html_path
+        self.title = title
+        self.poll_interval = poll_interval
+        self.summary: Optional[dict] = None
+        self._done = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def start(self) -> None:
+        # Left over from an interrupted run of this scan; Nuclei rewrites it from scratch
+        if os.path.exists(self.json_path):
+            os.remove(self.json_path)
+        self._thread = threading.Thread(target=self._follow, name="nuclei-report", daemon=True)
+        self._thread.start()
+
+    def stop(self) -> Optional[dict]:
+        """Call once the tool has exited; returns the report summary (None if the report failed)."""
+        self._done.set()
+        if self._thread is not None:
+            self._thread.join()
+        return self.summary
+
+    def _follow(self) -> None:
+        handle = None
+        pending = b""
+        try:
+            with NucleiHtmlReport(self.html_path, self.title) as report:
+                while True:
+                    finished = self._done.is_set()  # checked before reading so the last read sees all output
+                    if handle is None and os.path.exists(self.json_path):
+                        handle = open(self.json_path, "rb")
+                    if handle is not None:
+                        for chunk in iter(handle.readline, b""):
+                            if not chunk.endswith(b"\n"):
+                                pending += chunk  # line still being written
+                                continue
+                            report.add_line((pending + chunk).decode("utf-8", "replace"))
+                            pending = b""
+                        report.flush()
+                    if finished:
+                        break
+                    self._done.wait(self.poll_interval)
+                if pending:
+                    report.add_line(pending.decode("utf-8", "replace"))
+                self.summary = report.close()
+        except Exception as exc:
+            print(f"[nuclei] HTML report error: {exc}")
+        finally:
+            if handle is not None:
+                handle.close()
@@ -0,0 +1,211 @@
+import contextlib
+import os
+import sqlite3
+import threading
+import time
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple
+
+# --- Configuration ---
+# Lives next to the reports so it survives container restarts (./reports is a volume).
+SCAN_DB_PATH = os.getenv("SCAN_DB_PATH", os.path.join(os.path.dirname(os.path.abspath(__file__)), "reports", "scans.db"))
+MAX_PAGE_SIZE = 200
+
+# Allowed tool status transitions (anything else is rejected).
+TOOL_TRANSITIONS = {
+    "in_progress": ("queued",),
+    "finished": ("in_progress",),
+    "failed": ("queued", "in_progress"),
+}
+ACTIVE = ("queued", "in_progress")
+TERMINAL = ("completed", "finished_with_errors")
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS scans (
+    id TEXT PRIMARY KEY,
+    target TEXT NOT NULL,
+    status TEXT NOT NULL,
+    priority INTEGER NOT NULL,
+    model_type TEXT,
+    model_name TEXT,
+    created_at REAL NOT NULL,
+    updated_at REAL NOT NULL
+);
+CREATE TABLE IF NOT EXISTS scan_tools (
+    scan_id TEXT NOT NULL REFERENCES scans(id),
+    tool TEXT NOT NULL,
+    status TEXT NOT NULL,
+    exit_code INTEGER,
+    started_at REAL,
+    finished_at REAL,
+    PRIMARY KEY (scan_id, tool)
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS idx_scans_created ON scans(created_at, id);
+CREATE INDEX IF NOT EXISTS idx_scans_status ON scans(status, created_at, id);
+CREATE INDEX IF NOT EXISTS idx_scans_target ON scans(target, created_at, id);
+CREATE INDEX IF NOT EXISTS idx_scan_tools_status ON scan_tools(status);
+"""
+
+
+def overall_status(tool_statuses: Iterable[str]) -> str:
+    """Aggregate tool statuses into a single scan status."""
+    statuses = list(tool_statuses)
+    if "in_progress" in statuses:
+        return "in_progress"
+    if "queued" in statuses:
+        # Some tools may already be done while others wait for a slot
+        return "in_progress" if any(status not in ACTIVE for status in statuses) else "queued"
+    if "failed" in statuses:
+        return "finished_with_errors"
+    return "completed"
+
+
+class ScanStore:
+    """
+    Durable scan and tool status store (SQLite, WAL mode).
+
+    Each thread gets its own connection. Status changes run in a single
+    IMMEDIATE transaction that checks the previous tool status and
+    recomputes the scan status, so concurrent tool threads cannot lose
+    each other's updates.
+    """
+
+    def __init__(self, path: str = SCAN_DB_PATH):
+        self.path = path
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        self._local = threading.local()
+        self._conn().executescript(SCHEMA)
+
+    def _conn(self) -> sqlite3.Connection:
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=30, isolation_level=None, check_same_thread=False)
+            conn.row_factory = sqlite3.Row
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        return conn
+
+    @contextlib.contextmanager
+    def _transaction(self) -> Iterator[sqlite3.Connection]:
+        conn = self._conn()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            yield conn
+        except BaseException:
+            conn.execute("ROLLBACK")
+            raise
+        conn.execute("COMMIT")
+
+    # --- writes ---
+    def create_scan(self, scan_id: str, target: str, tools: List[str], priority: int,
+                    model_type: str, model_name: str) -> None:
+        now = time.time()
+        with self._transaction() as conn:
+            conn.execute(
+                "INSERT INTO scans (id, target, status, priority, model_type, model_name, created_at, updated_at) "
+                "VALUES (?, ?, 'queued', ?, ?, ?, ?, ?)",
+                (scan_id, target, priority, model_type, model_name, now, now),
+            )
+            conn.executemany(
+                "INSERT INTO scan_tools (scan_id, tool, status) VALUES (?, ?, 'queued')",
+                [(scan_id, tool) for tool in tools],
+            )
+
+    def transition(self, scan_id: str, tool: str, status: str, exit_code: Optional[int] = None) -> Optional[str]:
+        """Move a tool to status if its current status allows it; returns the new scan status, or None if rejected."""
+        now = time.time()
+        with self._transaction() as conn:
+            previous = TOOL_TRANSITIONS[status]
+            placeholders = ",".join("?" * len(previous))
+            cursor = conn.execute(
+                "UPDATE scan_tools SET status = ?, exit_code = COALESCE(?, exit_code), "
+                "started_at = CASE WHEN ? = 'in_progress' THEN ? ELSE started_at END, "
+                "finished_at = CASE WHEN ? IN ('finished', 'failed') THEN ? ELSE finished_at END "
+                f"WHERE scan_id = ? AND tool = ? AND status IN ({placeholders})",
+                (status, exit_code, status, now, status, now, scan_id, tool, *previous),
+            )
+            if cursor.rowcount == 0:
+                return None
+            return self._refresh_scan(conn, scan_id, now)
+
+    def _refresh_scan(self, conn: sqlite3.Connection, scan_id: str, now: float) -> str:
+        statuses = [row[0] for row in conn.execute("SELECT status FROM scan_tools WHERE scan_id = ?", (scan_id,))]
+        scan_status = overall_status(statuses)
+        conn.execute("UPDATE scans SET status = ?, updated_at = ? WHERE id = ?", (scan_status, now, scan_id))
+        return scan_status
+
+    def recover(self) -> List[sqlite3.Row]:
+        """
+        Requeue tools that were running when the server stopped and return
+        every queued (scan, tool) so the caller can hand them to the scheduler.
+        """
+        now = time.time()
+        with self._transaction() as conn:
+            interrupted = [row[0] for row in conn.execute(
+                "SELECT DISTINCT scan_id FROM scan_tools WHERE status = 'in_progress'")]
+            conn.execute("UPDATE scan_tools SET status = 'queued', started_at = NULL WHERE status = 'in_progress'")
+            for scan_id in interrupted:
+                self._refresh_scan(conn, scan_id, now)
+            return conn.execute(
+                "SELECT t.scan_id, t.tool, s.target, s.priority, s.model_name FROM scan_tools t "
+                "JOIN scans s ON s.id = t.scan_id WHERE t.status = 'queued' ORDER BY s.created_at"
+            ).fetchall()
+
+    # --- reads ---
+    def _tools(self, scan_ids: List[str]) -> Dict[str, Dict[str, str]]:
+        tools: Dict[str, Dict[str, str]] = {scan_id: {} for scan_id in scan_ids}
+        if scan_ids:
+            rows = self._conn().execute(
+                f"SELECT scan_id, tool, status FROM scan_tools WHERE scan_id IN ({','.join('?' * len(scan_ids))})",
+                scan_ids,
+            )
+            for scan_id, tool, status in rows:
+                tools[scan_id][tool] = status
+        return tools
+
+    @staticmethod
+    def _scan_dict(row: sqlite3.Row, tools: Dict[str, str]) -> dict:
+        return {
+            "scan_id": row["id"],
+            "target": row["target"],
+            "status": row["status"],
+            "priority": row["priority"],
+            "model_name": row["model_name"],
+            "created_at": row["created_at"],
+            "updated_at": row["updated_at"],
+            "tools": tools,
+        }
+
+    def get_scan(self, scan_id: str) -> Optional[dict]:
+        row = self._conn().execute("SELECT * FROM scans WHERE id = ?", (scan_id,)).fetchone()
+        if row is None:
+            return None
+        return self._scan_dict(row, self._tools([scan_id])[scan_id])
+
+    def list_scans(self, status: Optional[str] = None, target: Optional[str] = None, limit: int = 50,
+                   cursor: Optional[str] = None) -> Tuple[List[dict], Optional[str]]:
+        """Newest scans first; cursor is the next_cursor of the previous page."""
+        limit = max(1, min(limit, MAX_PAGE_SIZE))
+        where, params = [], []
+        if status:
+            where.append("status = ?")
+            params.append(status)
+        if target:
+            where.append("target = ?")
+            params.append(target)
+        if cursor:
+            created_at, _, scan_id = cursor.partition(",")
+            where.append("(created_at, id) < (?, ?)")
+            params.extend([float(created_at), scan_id])
+        sql = "SELECT * FROM scans"
+        if where:
+            sql += " WHERE " + " AND ".join(where)
+        sql += " ORDER BY created_at DESC, id DESC LIMIT ?"
+        rows = self._conn().execute(sql, (*params, limit + 1)).fetchall()
+
+        next_cursor = None
+        if len(rows) > limit:
+            rows = rows[:limit]
+            next_cursor = f"{rows[-1]['created_at']!r},{rows[-1]['id']}"
+        tools = self._tools([row["id"] for row in rows])
+        return [self._scan_dict(row, tools[row["id"]]) for row in rows], next_cursor
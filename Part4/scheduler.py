@@ -0,0 +1,163 @@
+import os
+import threading
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+from typing import Callable, Deque, Dict, List, Optional
+
+# --- Configuration ---
+# Total tool runs at once (each is a Docker container or a Giskard process).
+SCAN_WORKERS = int(os.getenv("SCAN_WORKERS", "4"))
+# Per-tool caps, e.g. "zap=2,nuclei=2,giskard=1"; tools not listed may use every worker.
+SCAN_TOOL_LIMITS = os.getenv("SCAN_TOOL_LIMITS", "zap=2,nuclei=2,giskard=1")
+DEFAULT_PRIORITY = 5  # 0 = most urgent
+
+
+def parse_tool_limits(raw: str) -> Dict[str, int]:
+    """Parse "tool=N,tool=N" into a dict."""
+    limits = {}
+    for part in raw.split(","):
+        if "=" in part:
+            tool, limit = part.split("=", 1)
+            limits[tool.strip()] = max(1, int(limit))
+    return limits
+
+
+@dataclass
+class Job:
+    """One tool run for one scan."""
+    scan_id: str
+    tool: str
+    target: str
+    run: Callable[[], None]
+    priority: int = DEFAULT_PRIORITY
+
+
+class ScanScheduler:
+    """
+    Priority job queue with a bounded worker pool and per-tool limits.
+
+    Jobs wait in per-priority, per-target lanes. The dispatch loop starts
+    the most urgent job whose tool has a free slot, taking targets in
+    round-robin order within a priority level so one target with many
+    scans cannot starve the others.
+    """
+
+    def __init__(self, workers: int = SCAN_WORKERS, tool_limits: Optional[Dict[str, int]] = None):
+        self.workers = workers
+        self.tool_limits = parse_tool_limits(SCAN_TOOL_LIMITS) if tool_limits is None else tool_limits
+        self._lanes: Dict[int, Dict[str, Deque[Job]]] = {}  # priority -> target -> FIFO (dict order = round-robin order)
+        self._running: Dict[str, int] = {}  # tool -> running jobs
+        self._running_total = 0
+        self._cond = threading.Condition()
+        self._pool: Optional[ThreadPoolExecutor] = None
+        self._dispatcher: Optional[threading.Thread] = None
+        self._stopping = False
+
+    # --- lifecycle ---
+    def start(self) -> None:
+        with self._cond:
+            if self._dispatcher is not None:
+                return
+            self._stopping = False
+            self._pool = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="scan-worker")
+            self._dispatcher = threading.Thread(target=self._dispatch_loop, name="scan-dispatcher", daemon=True)
+            self._dispatcher.start()
+
+    def stop(self) -> None:
+        """Stop dispatching; running tools finish, queued jobs stay queued."""
+        with self._cond:
+            self._stopping = True
+            self._cond.notify_all()
+        if self._dispatcher is not None:
+            self._dispatcher.join()
+            self._dispatcher = None
+        if self._pool is not None:
+            self._pool.shutdown(wait=False)
+            self._pool = None
+
+    # --- queue ---
+    def submit(self, job: Job) -> None:
+        with self._cond:
+            lanes = self._lanes.setdefault(job.priority, {})
+            lanes.setdefault(job.target, deque()).append(job)
+            self._cond.notify_all()
+
+    def _fair_order(self) -> List[Job]:
+        """Queued jobs in the order they are considered: priority, then one job per target per round."""
+        order = []
+        for priority in sorted(self._lanes):
+            lanes = [list(jobs) for jobs in self._lanes[priority].values()]
+            depth = max((len(jobs) for jobs in lanes), default=0)
+            for index in range(depth):
+                order.extend(jobs[index] for jobs in lanes if index < len(jobs))
+        return order
+
+    def queue_positions(self, scan_id: str) -> Dict[str, int]:
+        """1-based queue position of each queued tool of a scan among queued jobs of the same tool."""
+        positions = {}
+        seen: Dict[str, int] = {}
+        with self._cond:
+            for job in self._fair_order():
+                seen[job.tool] = seen.get(job.tool, 0) + 1
+                if job.scan_id == scan_id:
+                    positions[job.tool] = seen[job.tool]
+        return positions
+
+    def stats(self) -> dict:
+        with self._cond:
+            queued: Dict[str, int] = {}
+            for job in self._fair_order():
+                queued[job.tool] = queued.get(job.tool, 0) + 1
+            return {
+                "workers": self.workers,
+                "tool_limits": dict(self.tool_limits),
+                "running": dict(self._running),
+                "queued": queued,
+            }
+
+    # --- dispatch ---
+    def _has_slot(self, tool: str) -> bool:
+        limit = self.tool_limits.get(tool, self.workers)
+        return self._running_total < self.workers and self._running.get(tool, 0) < limit
+
+    def _next_job(self) -> Optional[Job]:
+        """Pop the next runnable job (caller holds the lock)."""
+        if self._running_total >= self.workers:
+            return None
+        for priority in sorted(self._lanes):
+            lanes = self._lanes[priority]
+            for target, jobs in list(lanes.items()):
+                for job in jobs:
+                    if self._has_slot(job.tool):
+                        jobs.remove(job)
+                        # Served target goes to the back of the round-robin order
+                        del lanes[target]
+                        if jobs:
+                            lanes[target] = jobs
+                        elif not lanes:
+                            del self._lanes[priority]
+                        return job
+        return None
+
+    def _dispatch_loop(self) -> None:
+        with self._cond:
+            while not self._stopping:
+                job = self._next_job()
+                if job is None:
+                    self._cond.wait()
+                    continue
+                self._running[job.tool] = self._running.get(job.tool, 0) + 1
+                self._running_total += 1
+                self._pool.submit(self._run, job)
+
+    def _run(self, job: Job) -> None:
+        try:
+            job.run()
+        except Exception as exc:
+            print(f"[scheduler] Job {job.tool} for scan {job.scan_id} crashed: {exc}")
+        finally:
+            with self._cond:
+                self._running[job.tool] -= 1
+                self._running_total -= 1
+                self._cond.notify_all()
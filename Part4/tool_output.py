@@ -0,0 +1,119 @@
+import asyncio
+import os
+import threading
+from collections import OrderedDict, deque
+from typing import Deque, Dict, List, Optional, Set, Tuple
+
+# --- Configuration ---
+# Output lines kept per tool of a scan (older lines are dropped).
+TOOL_OUTPUT_LINES = int(os.getenv("TOOL_OUTPUT_LINES", "1000"))
+# Finished scans whose output stays available for /scan/stream.
+TOOL_OUTPUT_SCANS = int(os.getenv("TOOL_OUTPUT_SCANS", "50"))
+MAX_LINE_LENGTH = 4000
+
+Event = Tuple[int, str, dict]  # (sequence number, event type, data)
+
+
+class ScanFeed:
+    """
+    Live output and status events of one scan.
+
+    Log lines go into a bounded ring buffer per tool, status changes into
+    a small buffer of their own. Every event gets a sequence number, so a
+    reader can ask for everything after the last event it saw (SSE
+    Last-Event-ID). Publishing happens on tool threads; asyncio readers
+    are woken through their event loop.
+    """
+
+    def __init__(self, lines_per_tool: int = TOOL_OUTPUT_LINES):
+        self.lines_per_tool = lines_per_tool
+        self._seq = 0
+        self._lines: Dict[str, Deque[Event]] = {}
+        self._statuses: Deque[Event] = deque(maxlen=100)
+        self._waiters: Set[Tuple[asyncio.AbstractEventLoop, asyncio.Event]] = set()
+        self._lock = threading.Lock()
+
+    def publish(self, kind: str, data: dict) -> None:
+        with self._lock:
+            self._seq += 1
+            event = (self._seq, kind, data)
+            if kind == "log":
+                buffer = self._lines.get(data["tool"])
+                if buffer is None:
+                    buffer = self._lines[data["tool"]] = deque(maxlen=self.lines_per_tool)
+                buffer.append(event)
+            else:
+                self._statuses.append(event)
+            waiters = list(self._waiters)
+        for loop, wakeup in waiters:
+            try:
+                loop.call_soon_threadsafe(wakeup.set)
+            except RuntimeError:  # reader's loop already closed
+                pass
+
+    def since(self, seq: int) -> List[Event]:
+        """Buffered events newer than seq, oldest first."""
+        events = []
+        with self._lock:
+            for buffer in (*self._lines.values(), self._statuses):
+                for event in reversed(buffer):
+                    if event[0] <= seq:
+                        break
+                    events.append(event)
+        events.sort(key=lambda event: event[0])
+        return events
+
+    def tail(self, tool: str, count: int) -> List[str]:
+        with self._lock:
+            buffer = list(self._lines.get(tool, ()))[-count:]
+        return [data["line"] for _, _, data in buffer]
+
+    def subscribe(self) -> asyncio.Event:
+        wakeup = asyncio.Event()
+        with self._lock:
+            self._waiters.add((asyncio.get_running_loop(), wakeup))
+        return wakeup
+
+    def unsubscribe(self, wakeup: asyncio.Event) -> None:
+        with self._lock:
+            self._waiters = {waiter for waiter in self._waiters if waiter[1] is not wakeup}
+
+
+class OutputHub:
+    """Feeds of active scans plus the most recently finished ones."""
+
+    def __init__(self, keep_finished: int = TOOL_OUTPUT_SCANS):
+        self.keep_finished = keep_finished
+        self._feeds: Dict[str, ScanFeed] = {}
+        self._finished: "OrderedDict[str, None]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def feed(self, scan_id: str) -> ScanFeed:
+        with self._lock:
+            feed = self._feeds.get(scan_id)
+            if feed is None:
+                feed = self._feeds[scan_id] = ScanFeed()
+            return feed
+
+    def get(self, scan_id: str) -> Optional[ScanFeed]:
+        with self._lock:
+            return self._feeds.get(scan_id)
+
+    def finish(self, scan_id: str) -> None:
+        """Mark a scan done; its feed is dropped once enough newer scans have finished."""
+        with self._lock:
+            self._finished[scan_id] = None
+            self._finished.move_to_end(scan_id)
+            while len(self._finished) > self.keep_finished:
+                old_id, _ = self._finished.popitem(last=False)
+                self._feeds.pop(old_id, None)
+
+    def stream_lines(self, scan_id: str, tool: str, pipe) -> None:
+        """Read a tool's text pipe line by line into its ring buffer (blocks until EOF)."""
+        feed = self.feed(scan_id)
+        while True:
+            # Bounded read: a huge line without newlines arrives in MAX_LINE_LENGTH pieces
+            line = pipe.readline(MAX_LINE_LENGTH)
+            if not line:
+                break
+            feed.publish("log", {"tool": tool, "line": line.rstrip("\n")})
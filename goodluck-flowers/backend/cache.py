@@ -0,0 +1,345 @@
+"""
+In-process caches for the GoodLuck Flowers backend.
+
+CatalogCache keeps the /api/products response pre-serialized together with
+its ETag, so steady-state catalog reads never touch SQLite. Writers that
+change the catalog (admin create/delete, stock-changing orders) call
+invalidate(); the next read rebuilds the body once.
+
+ResponseCache keeps AI assistant answers keyed on (model, normalized
+prompt) with LRU + TTL eviction and entry/byte limits, so repeated care
+questions don't cost another Ollama generation.
+
+SessionCache maps bearer tokens to user ids with a TTL, so authenticated
+requests don't look the token up in the sessions table. Its store is
+pluggable: a per-worker dict, or a small SQLite file shared by every worker
+on the host (a local stand-in for a shared cache service).
+"""
+import hashlib
+import os
+import sqlite3
+import tempfile
+import threading
+import time
+from collections import OrderedDict
+from typing import Dict, Iterable, NamedTuple, Optional, Tuple
+
+# Safety net for multi-worker deployments, where an admin write only
+# invalidates the cache of the worker that handled it
+CATALOG_CACHE_TTL = float(os.getenv("CATALOG_CACHE_TTL", "300"))
+
+# AI answer cache
+AI_CACHE_TTL = float(os.getenv("AI_CACHE_TTL", "3600"))
+AI_CACHE_MAX_ENTRIES = int(os.getenv("AI_CACHE_MAX_ENTRIES", "1024"))
+AI_CACHE_MAX_BYTES = int(os.getenv("AI_CACHE_MAX_BYTES", str(8 * 1024 * 1024)))
+AI_CACHE_PERSIST = os.getenv("AI_CACHE_PERSIST", "0") == "1"  # also look answers up in ai_conversations
+
+# Session token cache
+SESSION_CACHE_TTL = float(os.getenv("SESSION_CACHE_TTL", "900"))
+SESSION_CACHE_BACKEND = os.getenv("SESSION_CACHE_BACKEND", "memory")  # memory | shared
+SESSION_CACHE_PATH = os.getenv(
+    "SESSION_CACHE_PATH", os.path.join(tempfile.gettempdir(), "goodluck-flowers-sessions.db")
+)
+
+
+class CachedBody(NamedTuple):
+    body: bytes
+    etag: str
+    built_at: float
+
+
+def make_etag(body: bytes) -> str:
+    return '"' + hashlib.blake2b(body, digest_size=16).hexdigest() + '"'
+
+
+def etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    """True when an If-None-Match request header matches the current ETag."""
+    if not if_none_match:
+        return False
+    candidates = [tag.strip() for tag in if_none_match.split(",")]
+    return "*" in candidates or etag in candidates or f"W/{etag}" in candidates
+
+
+class CatalogCache:
+    """Pre-serialized catalog body + ETag with write-through invalidation."""
+
+    def __init__(self, ttl: float = CATALOG_CACHE_TTL):
+        self.ttl = ttl
+        self._lock = threading.Lock()
+        self._entry: Optional[CachedBody] = None
+        self._generation = 0
+        self.hits = 0
+        self.misses = 0
+        self.invalidations = 0
+
+    @property
+    def generation(self) -> int:
+        """Read before loading rows; pass to store() so stale loads are dropped."""
+        return self._generation
+
+    def get(self) -> Optional[CachedBody]:
+        entry = self._entry
+        if entry is not None and (self.ttl <= 0 or time.monotonic() - entry.built_at < self.ttl):
+            self.hits += 1
+            return entry
+        self.misses += 1
+        return None
+
+    def store(self, generation: int, body: bytes) -> CachedBody:
+        entry = CachedBody(body, make_etag(body), time.monotonic())
+        with self._lock:
+            # An invalidation landed while we were reading - serve it, don't keep it
+            if generation == self._generation:
+                self._entry = entry
+        return entry
+
+    def invalidate(self) -> None:
+        with self._lock:
+            self._generation += 1
+            self._entry = None
+            self.invalidations += 1
+
+    def stats(self) -> dict:
+        entry = self._entry
+        return {
+            "cached": entry is not None,
+            "etag": entry.etag if entry else None,
+            "bytes": len(entry.body) if entry else 0,
+            "ttl_seconds": self.ttl,
+            "hits": self.hits,
+            "misses": self.misses,
+            "invalidations": self.invalidations,
+        }
+
+
+class ResponseCache:
+    """LRU + TTL cache of AI answers keyed on (model, normalized prompt)."""
+
+    def __init__(self, ttl: float = AI_CACHE_TTL, max_entries: int = AI_CACHE_MAX_ENTRIES,
+                 max_bytes: int = AI_CACHE_MAX_BYTES):
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+        # key -> (answer, size in bytes, expiry time); oldest first
+        self._entries: "OrderedDict[Tuple[str, str], Tuple[str, int, float]]" = OrderedDict()
+        self._bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    @staticmethod
+    def normalize(prompt: str) -> str:
+        return " ".join(prompt.lower().split())
+
+    def key(self, model: str, prompt: str) -> Tuple[str, str]:
+        return model, self.normalize(prompt)
+
+    def get(self, key: Tuple[str, str]) -> Optional[str]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            if entry[2] <= time.monotonic():
+                self._drop(key)
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry[0]
+
+    def put(self, key: Tuple[str, str], answer: str) -> None:
+        size = len(answer.encode("utf-8")) + len(key[1].encode("utf-8"))
+        if size > self.max_bytes:
+            return
+        with self._lock:
+            if key in self._entries:
+                self._drop(key)
+            self._entries[key] = (answer, size, time.monotonic() + self.ttl)
+            self._bytes += size
+            while len(self._entries) > self.max_entries or self._bytes > self.max_bytes:
+                self._drop(next(iter(self._entries)))
+                self.evictions += 1
+
+    def _drop(self, key: Tuple[str, str]) -> None:
+        _, size, _ = self._entries.pop(key)
+        self._bytes -= size
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "entries": len(self._entries),
+                "bytes": self._bytes,
+                "max_entries": self.max_entries,
+                "max_bytes": self.max_bytes,
+                "ttl_seconds": self.ttl,
+                "persist": AI_CACHE_PERSIST,
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+            }
+
+
+class MemorySessionStore:
+    """Per-worker token -> (user_id, expiry) dict."""
+
+    name = "memory"
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._entries: Dict[str, Tuple[int, float]] = {}
+
+    def get(self, token: str) -> Optional[int]:
+        entry = self._entries.get(token)
+        if entry is None:
+            return None
+        if entry[1] <= time.monotonic():
+            with self._lock:
+                self._entries.pop(token, None)
+            return None
+        return entry[0]
+
+    def set(self, token: str, user_id: int, ttl: float) -> None:
+        with self._lock:
+            self._entries[token] = (user_id, time.monotonic() + ttl)
+
+    def delete(self, tokens: Iterable[str]) -> None:
+        with self._lock:
+            for token in tokens:
+                self._entries.pop(token, None)
+
+    def size(self) -> int:
+        return len(self._entries)
+
+
+class SharedSessionStore:
+    """Token map in a SQLite file opened by every uvicorn worker on the host.
+
+    Same get/set/delete contract as MemorySessionStore, but a login handled
+    by one worker invalidates the old tokens for all of them.
+
+    size() is an approximate count kept by this worker's set/delete and
+    recounted on every purge, so stats() never queries the file.
+    """
+
+    name = "shared"
+    PURGE_EVERY = 256  # sets between sweeps of expired rows
+
+    def __init__(self, path: str = SESSION_CACHE_PATH):
+        self.path = path
+        self._local = threading.local()
+        self._sets = 0
+        conn = self._conn()
+        conn.execute(
+            "CREATE TABLE IF NOT EXISTS session_cache ("
+            "token TEXT PRIMARY KEY, user_id INTEGER NOT NULL, expires_at REAL NOT NULL)"
+        )
+        conn.execute("CREATE INDEX IF NOT EXISTS idx_session_cache_expires ON session_cache(expires_at)")
+        self._size = self._count(conn)
+
+    def _conn(self) -> sqlite3.Connection:
+        # One connection per thread; autocommit, nothing here is worth an fsync
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=0.1, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=OFF")
+            self._local.conn = conn
+        return conn
+
+    def get(self, token: str) -> Optional[int]:
+        row = self._conn().execute(
+            "SELECT user_id FROM session_cache WHERE token = ? AND expires_at > ?", (token, time.time())
+        ).fetchone()
+        return row[0] if row else None
+
+    def set(self, token: str, user_id: int, ttl: float) -> None:
+        conn = self._conn()
+        now = time.time()
+        conn.execute(
+            "INSERT OR REPLACE INTO session_cache (token, user_id, expires_at) VALUES (?, ?, ?)",
+            (token, user_id, now + ttl)
+        )
+        self._sets += 1
+        self._size += 1  # may count a replaced token twice until the next purge
+        if self._sets % self.PURGE_EVERY == 0:
+            conn.execute("DELETE FROM session_cache WHERE expires_at <= ?", (now,))
+            self._size = self._count(conn)
+
+    def delete(self, tokens: Iterable[str]) -> None:
+        cursor = self._conn().executemany("DELETE FROM session_cache WHERE token = ?", [(token,) for token in tokens])
+        self._size = max(0, self._size - max(0, cursor.rowcount))
+
+    @staticmethod
+    def _count(conn: sqlite3.Connection) -> int:
+        return conn.execute("SELECT COUNT(*) FROM session_cache").fetchone()[0]
+
+    def size(self) -> int:
+        return self._size
+
+
+def make_session_store(backend: str = SESSION_CACHE_BACKEND):
+    if backend == "memory":
+        return MemorySessionStore()
+    if backend == "shared":
+        return SharedSessionStore()
+    raise ValueError(f"Unknown SESSION_CACHE_BACKEND: {backend!r} (expected 'memory' or 'shared')")
+
+
+class SessionCache:
+    """Bearer token -> user_id with TTL; written on login, invalidated when sessions are deleted."""
+
+    def __init__(self, store=None, ttl: float = SESSION_CACHE_TTL):
+        self.store = store if store is not None else make_session_store()
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        self.invalidations = 0
+        self.errors = 0
+
+    def get(self, token: str) -> Optional[int]:
+        try:
+            user_id = self.store.get(token)
+        except sqlite3.Error:
+            # Shared store busy or unavailable - fall back to the sessions table
+            self.errors += 1
+            user_id = None
+        if user_id is None:
+            self.misses += 1
+        else:
+            self.hits += 1
+        return user_id
+
+    def set(self, token: str, user_id: int) -> None:
+        try:
+            self.store.set(token, user_id, self.ttl)
+        except sqlite3.Error:
+            self.errors += 1
+
+    def invalidate(self, tokens: Iterable[str]) -> None:
+        tokens = list(tokens)
+        if not tokens:
+            return
+        try:
+            self.store.delete(tokens)
+        except sqlite3.Error:
+            self.errors += 1
+        self.invalidations += len(tokens)
+
+    def stats(self) -> dict:
+        try:
+            entries = self.store.size()
+        except sqlite3.Error:
+            # Shared store busy - report the rest rather than failing /metrics
+            self.errors += 1
+            entries = None
+        return {
+            "backend": self.store.name,
+            "entries": entries,
+            "ttl_seconds": self.ttl,
+            "hits": self.hits,
+            "misses": self.misses,
+            "invalidations": self.invalidations,
+            "errors": self.errors,
+        }
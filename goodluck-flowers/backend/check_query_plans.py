@@ -0,0 +1,126 @@
+"""
+Query-plan regression check for the GoodLuck Flowers backend.
+
+Builds a fresh database with database/init_db.py (plus the shared session
+store table), collects every SQL statement literal from the backend modules
+and runs EXPLAIN QUERY PLAN on it. Exits with status 1 if any statement does a full table scan that is not
+explicitly allowed below.
+
+Usage:
+    python check_query_plans.py
+"""
+import ast
+import contextlib
+import glob
+import io
+import os
+import re
+import sqlite3
+import sys
+import tempfile
+
+BACKEND_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.join(BACKEND_DIR, '../database'))
+
+from init_db import init_database  # noqa: E402
+from cache import SharedSessionStore  # noqa: E402
+
+SQL_START = re.compile(r"^\s*(SELECT|INSERT|UPDATE|DELETE|WITH)\b", re.IGNORECASE)
+FULL_SCAN = re.compile(r"^SCAN (?:TABLE )?(?!CONSTANT ROW)(\w+)")
+
+# Statements whose full scan is intentional (normalized SQL -> reason)
+ALLOWED_FULL_SCANS = {
+    "SELECT * FROM products": "whole catalog, served from the catalog cache",
+    "SELECT COUNT(*) FROM session_cache": "entry recount at startup and every PURGE_EVERY sets",
+    "SELECT * FROM products ORDER BY id LIMIT 1 OFFSET 1": "empty /api/search: one page walked in rowid order",
+}
+
+
+def normalize(sql: str) -> str:
+    return " ".join(sql.split())
+
+
+def render_fstring(node: ast.JoinedStr) -> str:
+    """Turn an f-string into SQL, substituting 1 for every interpolated value."""
+    parts = []
+    for value in node.values:
+        if isinstance(value, ast.Constant):
+            parts.append(str(value.value))
+        else:
+            parts.append("1")
+    return "".join(parts)
+
+
+def collect_statements():
+    """Yield (location, sql) for every SQL string literal in the backend modules."""
+    for path in sorted(glob.glob(os.path.join(BACKEND_DIR, "*.py"))):
+        if os.path.basename(path) == os.path.basename(__file__):
+            continue
+        with open(path, "r", encoding="utf-8") as f:
+            tree = ast.parse(f.read(), filename=path)
+
+        fstring_parts = set()
+        for node in ast.walk(tree):
+            if isinstance(node, ast.JoinedStr):
+                fstring_parts.update(id(value) for value in node.values)
+
+        for node in ast.walk(tree):
+            if isinstance(node, ast.JoinedStr):
+                sql = render_fstring(node)
+            elif isinstance(node, ast.Constant) and isinstance(node.value, str) and id(node) not in fstring_parts:
+                sql = node.value
+            else:
+                continue
+            if SQL_START.match(sql):
+                yield f"{os.path.basename(path)}:{node.lineno}", sql
+
+
+def bindings(sql: str):
+    names = re.findall(r"(?<!:):(\w+)", sql)
+    if names:
+        return {name: None for name in names}
+    return (None,) * sql.count("?")
+
+
+def main() -> int:
+    failures = []
+    warnings = []
+    checked = 0
+
+    with tempfile.TemporaryDirectory() as tmp:
+        db_path = os.path.join(tmp, "plan_check.db")
+        with contextlib.redirect_stdout(io.StringIO()):
+            init_database(db_path)
+        # The shared session store lives in its own file; plan its table alongside
+        SharedSessionStore(db_path)
+        conn = sqlite3.connect(db_path)
+
+        for location, sql in collect_statements():
+            try:
+                plan = conn.execute(f"EXPLAIN QUERY PLAN {sql}", bindings(sql)).fetchall()
+            except sqlite3.Error as exc:
+                failures.append(f"{location}: cannot plan ({exc}): {normalize(sql)}")
+                continue
+            checked += 1
+
+            for row in plan:
+                detail = row[-1]
+                scan = FULL_SCAN.match(detail)
+                if scan and "VIRTUAL TABLE" not in detail:
+                    if normalize(sql) in ALLOWED_FULL_SCANS:
+                        continue
+                    failures.append(f"{location}: full scan of {scan.group(1)}: {normalize(sql)}")
+                elif "USE TEMP B-TREE" in detail:
+                    warnings.append(f"{location}: {detail}: {normalize(sql)}")
+        conn.close()
+
+    for warning in warnings:
+        print(f"[warn] {warning}")
+    for failure in failures:
+        print(f"[FAIL] {failure}")
+    print(f"Checked {checked} statements: {len(failures)} failure(s), {len(warnings)} warning(s)")
+    return 1 if failures else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
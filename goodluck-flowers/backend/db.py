@@ -0,0 +1,364 @@
+"""
+SQLite connection pool for the GoodLuck Flowers backend.
+
+Every worker process keeps a small set of warm connections instead of
+opening the database file on every request. Connections are opened in WAL
+mode with tuned pragmas so readers keep going while orders and comments are
+being written.
+
+Handlers keep the familiar ``conn = get_db()`` / ``conn.close()`` shape:
+``close()`` on a pooled connection hands it back to the pool instead of
+closing the file.
+
+The async handlers never touch sqlite3 on the event loop. They hand a
+plain function to ``DBExecutor.run()``, which runs it on a dedicated
+thread pool with a bounded queue and awaits the result.
+"""
+import asyncio
+import os
+import queue
+import sqlite3
+import threading
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+
+from metrics import DB_FETCH_SECONDS, DB_ROWS, DB_STATEMENT_LATENCY, statement_label
+
+# Pool settings (override with environment variables)
+DB_POOL_SIZE = int(os.getenv("DB_POOL_SIZE", "8"))
+DB_POOL_TIMEOUT = float(os.getenv("DB_POOL_TIMEOUT", "5.0"))  # seconds to wait for a free connection
+DB_BUSY_TIMEOUT_MS = int(os.getenv("DB_BUSY_TIMEOUT_MS", "5000"))
+DB_SYNCHRONOUS = os.getenv("DB_SYNCHRONOUS", "NORMAL")  # NORMAL is safe with WAL
+DB_MMAP_SIZE = int(os.getenv("DB_MMAP_SIZE", str(256 * 1024 * 1024)))
+DB_CACHE_SIZE_KB = int(os.getenv("DB_CACHE_SIZE_KB", "16384"))
+
+# Executor settings - keep workers <= pool size so jobs never wait on the pool
+DB_EXECUTOR_WORKERS = int(os.getenv("DB_EXECUTOR_WORKERS", str(DB_POOL_SIZE)))
+DB_EXECUTOR_QUEUE = int(os.getenv("DB_EXECUTOR_QUEUE", "256"))  # jobs allowed to wait for a worker
+LATENCY_SAMPLES = 2048  # recent jobs kept for percentile reporting
+
+
+class PoolTimeout(Exception):
+    """Raised when no pooled connection becomes free within the timeout."""
+
+
+class DBOverloaded(Exception):
+    """Raised when the DB executor queue is full."""
+
+
+class DictRowFactory:
+    """Row factory building the response dict straight from the row tuple.
+
+    Column names are read once per statement rather than once per row.
+    """
+
+    __slots__ = ("_description", "_keys")
+
+    def __init__(self):
+        self._description = None
+        self._keys = ()
+
+    def __call__(self, cursor: sqlite3.Cursor, row: tuple) -> dict:
+        description = cursor.description
+        if description is not self._description:
+            self._description = description
+            self._keys = tuple(column[0] for column in description)
+        return dict(zip(self._keys, row))
+
+
+def dict_cursor(conn: sqlite3.Connection) -> sqlite3.Cursor:
+    """Cursor whose rows are plain dicts, ready to serialize without a copy."""
+    cursor = conn.cursor()
+    cursor.row_factory = DictRowFactory()
+    return cursor
+
+
+class TimedCursor(sqlite3.Cursor):
+    """Cursor recording execute time, fetch time and row counts per statement (see metrics.py)."""
+
+    _label = "unknown"
+
+    def execute(self, sql, parameters=()):
+        self._label = statement_label(sql)
+        start = time.perf_counter()
+        try:
+            return super().execute(sql, parameters)
+        finally:
+            DB_STATEMENT_LATENCY.observe(time.perf_counter() - start, statement=self._label)
+            if self.rowcount > 0:  # INSERT/UPDATE/DELETE; SELECT rows are counted as fetched
+                DB_ROWS.inc(self.rowcount, statement=self._label)
+
+    def executemany(self, sql, seq_of_parameters):
+        self._label = statement_label(sql)
+        start = time.perf_counter()
+        try:
+            return super().executemany(sql, seq_of_parameters)
+        finally:
+            DB_STATEMENT_LATENCY.observe(time.perf_counter() - start, statement=self._label)
+            if self.rowcount > 0:
+                DB_ROWS.inc(self.rowcount, statement=self._label)
+
+    def _fetched(self, start: float, rows: int) -> None:
+        DB_FETCH_SECONDS.inc(time.perf_counter() - start, statement=self._label)
+        if rows:
+            DB_ROWS.inc(rows, statement=self._label)
+
+    def fetchone(self):
+        start = time.perf_counter()
+        row = super().fetchone()
+        self._fetched(start, row is not None)
+        return row
+
+    def fetchmany(self, *args, **kwargs):
+        start = time.perf_counter()
+        rows = super().fetchmany(*args, **kwargs)
+        self._fetched(start, len(rows))
+        return rows
+
+    def fetchall(self):
+        start = time.perf_counter()
+        rows = super().fetchall()
+        self._fetched(start, len(rows))
+        return rows
+
+    def __next__(self):
+        start = time.perf_counter()
+        row = super().__next__()
+        self._fetched(start, 1)
+        return row
+
+
+class PooledConnection(sqlite3.Connection):
+    """sqlite3 connection whose close() returns it to the owning pool.
+
+    Its cursors (including those made by conn.execute()) are TimedCursors.
+    """
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.pool = None
+        self.checked_out = False
+
+    def cursor(self, factory=TimedCursor):
+        return super().cursor(factory)
+
+    def execute(self, sql, parameters=()):
+        return self.cursor().execute(sql, parameters)
+
+    def executemany(self, sql, seq_of_parameters):
+        return self.cursor().executemany(sql, seq_of_parameters)
+
+    def close(self):
+        if self.pool is None:
+            super().close()
+        else:
+            self.pool.release(self)
+
+    def close_for_real(self):
+        self.pool = None
+        super().close()
+
+
+class ConnectionPool:
+    """Thread-safe pool of warm SQLite connections for one worker process."""
+
+    def __init__(self, db_path: str, size: int = DB_POOL_SIZE, timeout: float = DB_POOL_TIMEOUT):
+        self.db_path = db_path
+        self.size = size
+        self.timeout = timeout
+        # LIFO so the most recently used (hottest) connection is handed out first
+        self._idle = queue.LifoQueue()
+        self._slots = threading.BoundedSemaphore(size)
+        self._lock = threading.Lock()
+        self._all = []
+        # Metrics
+        self._acquired = 0
+        self._timeouts = 0
+        self._wait_total = 0.0
+        self._wait_max = 0.0
+
+    def _open(self) -> PooledConnection:
+        conn = sqlite3.connect(
+            self.db_path,
+            factory=PooledConnection,
+            check_same_thread=False,
+            timeout=DB_BUSY_TIMEOUT_MS / 1000,
+        )
+        conn.row_factory = sqlite3.Row
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute(f"PRAGMA synchronous={DB_SYNCHRONOUS}")
+        conn.execute(f"PRAGMA busy_timeout={DB_BUSY_TIMEOUT_MS}")
+        conn.execute(f"PRAGMA mmap_size={DB_MMAP_SIZE}")
+        conn.execute(f"PRAGMA cache_size=-{DB_CACHE_SIZE_KB}")
+        conn.execute("PRAGMA temp_store=MEMORY")
+        return conn
+
+    def _connect(self) -> PooledConnection:
+        conn = self._open()
+        conn.pool = self
+        with self._lock:
+            self._all.append(conn)
+        return conn
+
+    def dedicated(self) -> PooledConnection:
+        """Open a connection with the pool's pragmas that is not counted against the pool.
+
+        For long-lived owners such as the write-behind thread; close() really closes it.
+        """
+        return self._open()
+
+    def acquire(self) -> PooledConnection:
+        """Check out a connection, waiting up to ``timeout`` seconds for one."""
+        start = time.perf_counter()
+        if not self._slots.acquire(timeout=self.timeout):
+            with self._lock:
+                self._timeouts += 1
+            raise PoolTimeout(f"No database connection available after {self.timeout}s")
+        waited = time.perf_counter() - start
+
+        try:
+            conn = self._idle.get_nowait()
+        except queue.Empty:
+            try:
+                conn = self._connect()
+            except Exception:
+                self._slots.release()
+                raise
+        conn.checked_out = True
+
+        with self._lock:
+            self._acquired += 1
+            self._wait_total += waited
+            self._wait_max = max(self._wait_max, waited)
+        return conn
+
+    def release(self, conn: PooledConnection) -> None:
+        """Return a connection to the pool, discarding any open transaction."""
+        if not conn.checked_out:
+            return
+        conn.checked_out = False
+        try:
+            if conn.in_transaction:
+                conn.rollback()
+        except sqlite3.Error:
+            # Broken connection - drop it and let the next acquire open a fresh one
+            with self._lock:
+                self._all.remove(conn)
+            conn.close_for_real()
+        else:
+            self._idle.put(conn)
+        self._slots.release()
+
+    def close_all(self) -> None:
+        """Close every connection (used on shutdown)."""
+        with self._lock:
+            conns, self._all = self._all, []
+        for conn in conns:
+            conn.close_for_real()
+        self._idle = queue.LifoQueue()
+
+    def stats(self) -> dict:
+        with self._lock:
+            opened = len(self._all)
+            idle = self._idle.qsize()
+            return {
+                "pool_size": self.size,
+                "timeout_seconds": self.timeout,
+                "connections_open": opened,
+                "connections_idle": idle,
+                "connections_in_use": opened - idle,
+                "acquired_total": self._acquired,
+                "timeouts_total": self._timeouts,
+                "wait_seconds_total": round(self._wait_total, 6),
+                "wait_seconds_avg": round(self._wait_total / self._acquired, 6) if self._acquired else 0.0,
+                "wait_seconds_max": round(self._wait_max, 6),
+                "pragmas": {
+                    "journal_mode": "wal",
+                    "synchronous": DB_SYNCHRONOUS,
+                    "mmap_size": DB_MMAP_SIZE,
+                    "cache_size_kb": DB_CACHE_SIZE_KB,
+                    "busy_timeout_ms": DB_BUSY_TIMEOUT_MS,
+                },
+            }
+
+
+def percentiles(samples) -> dict:
+    """p50/p95/p99/max (in milliseconds) of a sequence of durations in seconds."""
+    ordered = sorted(samples)
+    if not ordered:
+        return {"p50_ms": 0.0, "p95_ms": 0.0, "p99_ms": 0.0, "max_ms": 0.0}
+
+    def pick(fraction):
+        return round(ordered[min(len(ordered) - 1, int(len(ordered) * fraction))] * 1000, 3)
+
+    return {
+        "p50_ms": pick(0.50),
+        "p95_ms": pick(0.95),
+        "p99_ms": pick(0.99),
+        "max_ms": round(ordered[-1] * 1000, 3),
+    }
+
+
+class DBExecutor:
+    """Dedicated thread pool that runs blocking database work off the event loop."""
+
+    def __init__(self, connect, workers: int = DB_EXECUTOR_WORKERS, max_queue: int = DB_EXECUTOR_QUEUE):
+        self.connect = connect
+        self.workers = workers
+        self.max_queue = max_queue
+        self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="db")
+        # Running + waiting jobs; anything beyond that is rejected immediately
+        self._slots = threading.BoundedSemaphore(workers + max_queue)
+        self._lock = threading.Lock()
+        self._pending = 0
+        self._completed = 0
+        self._rejected = 0
+        self._queue_waits = deque(maxlen=LATENCY_SAMPLES)
+        self._run_times = deque(maxlen=LATENCY_SAMPLES)
+
+    async def run(self, fn, *args):
+        """Await ``fn(conn, *args)`` executed on a worker thread with a pooled connection."""
+        if not self._slots.acquire(blocking=False):
+            with self._lock:
+                self._rejected += 1
+            raise DBOverloaded(f"Database queue full ({self.workers + self.max_queue} jobs pending)")
+        with self._lock:
+            self._pending += 1
+
+        future = self._executor.submit(self._call, time.perf_counter(), fn, args)
+        # Free the slot whether the job ran, failed or was cancelled before starting
+        future.add_done_callback(self._job_done)
+        return await asyncio.wrap_future(future)
+
+    def _job_done(self, future) -> None:
+        with self._lock:
+            self._pending -= 1
+            self._completed += 1
+        self._slots.release()
+
+    def _call(self, submitted: float, fn, args):
+        started = time.perf_counter()
+        self._queue_waits.append(started - submitted)
+        conn = self.connect()
+        try:
+            return fn(conn, *args)
+        finally:
+            conn.close()
+            self._run_times.append(time.perf_counter() - started)
+
+    def shutdown(self) -> None:
+        self._executor.shutdown(wait=True)
+
+    def stats(self) -> dict:
+        with self._lock:
+            pending, completed, rejected = self._pending, self._completed, self._rejected
+        return {
+            "workers": self.workers,
+            "max_queue": self.max_queue,
+            "jobs_pending": pending,
+            "jobs_completed_total": completed,
+            "jobs_rejected_total": rejected,
+            "queue_wait": percentiles(list(self._queue_waits)),
+            "run_time": percentiles(list(self._run_times)),
+        }
@@ -0,0 +1,178 @@
+"""
+Responsive product images for the GoodLuck Flowers frontend.
+
+/images/<file> serves the originals from frontend/images. With ``?w=`` and/or
+``?format=`` it serves a derivative instead: resized to one of the allowed
+widths and re-encoded as JPEG, WebP or AVIF (``format=auto`` picks the best
+one the browser lists in ``Accept``). Derivatives are generated once with
+Pillow on a worker thread and cached on disk under a name that includes the
+source file's mtime, so replacing an image invalidates its variants.
+
+Pillow is optional: without it the originals are served for every request.
+"""
+import asyncio
+import glob
+import os
+import tempfile
+from email.utils import formatdate
+from typing import Dict, Optional, Tuple
+
+from fastapi import HTTPException, Request, Response
+from fastapi.responses import FileResponse
+from starlette.concurrency import run_in_threadpool
+
+from static_assets import not_modified
+
+try:
+    from PIL import Image, ImageOps, features
+except ImportError:  # optional dependency
+    Image = None
+
+IMAGE_MAX_AGE = int(os.getenv("IMAGE_MAX_AGE", "86400"))  # seconds
+IMAGE_CACHE_DIR = os.getenv("IMAGE_CACHE_DIR", os.path.join(tempfile.gettempdir(), "goodluck-flowers-images"))
+IMAGE_QUALITY = int(os.getenv("IMAGE_QUALITY", "80"))
+# Requested widths snap up to one of these, which bounds the number of variants per image
+IMAGE_WIDTHS = tuple(sorted(int(w) for w in os.getenv("IMAGE_WIDTHS", "160,320,480,640,960,1280").split(",")))
+
+MEDIA_TYPES = {"jpeg": "image/jpeg", "png": "image/png", "webp": "image/webp", "avif": "image/avif"}
+EXTENSIONS = {"jpeg": "jpg", "png": "png", "webp": "webp", "avif": "avif"}
+SOURCE_FORMATS = {".jpg": "jpeg", ".jpeg": "jpeg", ".png": "png", ".webp": "webp"}
+SAVE_OPTIONS = {
+    "jpeg": {"quality": IMAGE_QUALITY, "optimize": True, "progressive": True},
+    "png": {"optimize": True},
+    "webp": {"quality": IMAGE_QUALITY, "method": 4},
+    "avif": {"quality": IMAGE_QUALITY - 20, "speed": 8},
+}
+
+
+def supported_formats() -> Tuple[str, ...]:
+    if Image is None:
+        return ()
+    formats = ["jpeg", "png"]
+    if features.check("webp"):
+        formats.append("webp")
+    if "AVIF" in Image.SAVE or features.check("avif"):
+        formats.append("avif")
+    return tuple(formats)
+
+
+def snap_width(width: int) -> int:
+    for allowed in IMAGE_WIDTHS:
+        if width <= allowed:
+            return allowed
+    return IMAGE_WIDTHS[-1]
+
+
+def stat_headers(path: str) -> Tuple[str, float, Dict[str, str]]:
+    stat = os.stat(path)
+    etag = f'"{stat.st_mtime_ns:x}-{stat.st_size:x}"'
+    return etag, stat.st_mtime, {
+        "ETag": etag,
+        "Last-Modified": formatdate(int(stat.st_mtime), usegmt=True),
+        "Cache-Control": f"public, max-age={IMAGE_MAX_AGE}",
+    }
+
+
+class ImageService:
+    """Serves originals and cached resized/re-encoded variants of frontend/images."""
+
+    def __init__(self, images_dir: str, cache_dir: str = IMAGE_CACHE_DIR):
+        self.images_dir = images_dir
+        self.cache_dir = cache_dir
+        self.formats = supported_formats()
+        # cache path -> in-progress generation, so a burst for a new variant encodes it once
+        self._pending: Dict[str, asyncio.Future] = {}
+        self.generated = 0
+        self.cache_hits = 0
+
+    def source(self, filename: str) -> str:
+        path = os.path.join(self.images_dir, filename)
+        if os.path.basename(filename) != filename or not os.path.isfile(path):
+            raise HTTPException(status_code=404, detail="Not Found")
+        return path
+
+    def pick_format(self, requested: Optional[str], accept: str) -> Optional[str]:
+        """Output format for a request, or None to keep the source format."""
+        if requested in (None, "", "original"):
+            return None
+        if requested == "auto":
+            for fmt in ("avif", "webp"):
+                if fmt in self.formats and MEDIA_TYPES[fmt] in accept:
+                    return fmt
+            return None
+        if requested == "jpg":
+            requested = "jpeg"
+        if requested not in MEDIA_TYPES:
+            raise HTTPException(status_code=400, detail=f"Unsupported format: {requested}")
+        # Requested but not available in this Pillow build: fall back to the source
+        return requested if requested in self.formats else None
+
+    def cache_path(self, source: str, width: Optional[int], fmt: str) -> str:
+        # <cache_dir>/<source file name>/<source mtime>-w<width>.<ext>
+        mtime = os.stat(source).st_mtime_ns
+        return os.path.join(self.cache_dir, os.path.basename(source), f"{mtime:x}-w{width or 0}.{EXTENSIONS[fmt]}")
+
+    def render(self, source: str, width: Optional[int], fmt: str, target: str) -> None:
+        """Resize/re-encode source into target (runs on a worker thread)."""
+        directory = os.path.dirname(target)
+        os.makedirs(directory, exist_ok=True)
+        with Image.open(source) as original:
+            image = ImageOps.exif_transpose(original)
+            if width and width < image.width:
+                height = max(1, round(image.height * width / image.width))
+                image = image.resize((width, height), Image.LANCZOS)
+            if fmt == "jpeg" and image.mode not in ("RGB", "L"):
+                image = image.convert("RGB")
+            fd, tmp = tempfile.mkstemp(dir=directory, suffix=".tmp")
+            try:
+                with os.fdopen(fd, "wb") as f:
+                    image.save(f, format=fmt.upper(), **SAVE_OPTIONS[fmt])
+                os.replace(tmp, target)
+            except BaseException:
+                os.unlink(tmp)
+                raise
+        # Variants of an older version of this image are dead weight now
+        current = os.path.basename(target).split("-w")[0] + "-w"
+        for stale in glob.glob(os.path.join(directory, "*")):
+            name = os.path.basename(stale)
+            # .tmp files belong to renders of other widths still in progress
+            if not name.startswith(current) and not name.endswith(".tmp"):
+                try:
+                    os.unlink(stale)
+                except OSError:
+                    pass
+        self.generated += 1
+
+    async def variant(self, source: str, width: Optional[int], fmt: str) -> str:
+        target = self.cache_path(source, width, fmt)
+        if os.path.exists(target):
+            self.cache_hits += 1
+            return target
+        future = self._pending.get(target)
+        if future is None:
+            future = asyncio.ensure_future(run_in_threadpool(self.render, source, width, fmt, target))
+            self._pending[target] = future
+            future.add_done_callback(lambda _: self._pending.pop(target, None))
+        await asyncio.shield(future)
+        return target
+
+    async def response(self, request: Request, filename: str, w: Optional[int], format: Optional[str]) -> Response:
+        source = self.source(filename)
+        accept = request.headers.get("accept", "")
+        path, media_type = source, None
+        vary = format == "auto"
+
+        if Image is not None and (w or format):
+            source_format = SOURCE_FORMATS.get(os.path.splitext(source)[1].lower(), "jpeg")
+            fmt = self.pick_format(format, accept) or source_format
+            width = snap_width(w) if w else None
+            if width or fmt != source_format:
+                path = await self.variant(source, width, fmt)
+                media_type = MEDIA_TYPES[fmt]
+
+        etag, mtime, headers = stat_headers(path)
+        if vary:
+            headers["Vary"] = "Accept"
+        if not_modified(request, etag, mtime):
+            return Response(status_code=304, headers=headers)
+        return FileResponse(path, media_type=media_type, headers=headers)
@@ -1,18 +1,28 @@
-from fastapi import FastAPI, HTTPException, Request, Depends
+from fastapi import FastAPI, HTTPException, Request, Depends, Query
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import JSONResponse, HTMLResponse, FileResponse
-from fastapi.staticfiles import StaticFiles
+from fastapi.responses import JSONResponse, HTMLResponse, Response, StreamingResponse
 from pydantic import BaseModel
 from typing import Optional, List
 import sqlite3
 import secrets
 import os
 import json
-import requests
+import re
+import httpx
+import logging
 from datetime import datetime
+from db import ConnectionPool, DBExecutor, DBOverloaded, PoolTimeout, dict_cursor
+from cache import AI_CACHE_PERSIST, CatalogCache, ResponseCache, SessionCache, etag_matches
+from ollama_client import AdmissionController, ModelRegistry, OllamaBusy, OllamaClient, OllamaError
+from write_behind import WriteBehindQueue
+from static_assets import AssetStore, brotli
+from images import ImageService, supported_formats
+from serialization import FastJSONResponse, dumps
+from app_logging import setup_logging, shutdown_logging
+from metrics import REGISTRY, MetricsMiddleware, stats_samples
 
 # Initialize FastAPI app
-app = FastAPI(title="GoodLuck Flowers API", version="1.0.0")
+app = FastAPI(title="GoodLuck Flowers API", version="1.0.0", default_response_class=FastJSONResponse)
 
 # VULNERABILITY: Overly permissive CORS
 app.add_middleware(
@@ -23,13 +33,38 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
-# Database path
-DB_PATH = os.path.join(os.path.dirname(__file__), '../database/flowers.db')
+# Per-route latency histograms, status codes and in-flight requests for /metrics
+app.add_middleware(MetricsMiddleware, router=app.router)
+
+# Structured logs go through a queue and are written by a background thread
+setup_logging()
+log = logging.getLogger("goodluck.api")
+
+# Database path (DB_PATH overrides it, e.g. for a seeded benchmark database)
+DB_PATH = os.getenv("DB_PATH", os.path.join(os.path.dirname(__file__), '../database/flowers.db'))
 
 # Serve images from frontend/images
 IMAGES_DIR = os.path.join(os.path.dirname(__file__), '../frontend/images')
 FRONTEND_DIR = os.path.join(os.path.dirname(__file__), '../frontend')
-app.mount("/images", StaticFiles(directory=IMAGES_DIR), name="images")
+
+# Originals plus resized / WebP / AVIF variants (?w=320&format=auto), cached on disk
+image_service = ImageService(IMAGES_DIR)
+
+# Pages, CSS and JS held in memory with ETags, gzip/brotli variants and hashed URLs
+static_assets = AssetStore(FRONTEND_DIR)
+
+@app.on_event("startup")
+async def load_static_assets():
+    # Assets first: the pages are rewritten to point at their hashed URLs
+    static_assets.load_asset('style.css', 'text/css')
+    static_assets.load_asset('script.js', 'application/javascript; charset=utf-8')
+    for page in ('index.html', 'orders.html', 'users.html'):
+        static_assets.load_page(page)
+    # Both are in requirements.txt; without them the features quietly turn off
+    if brotli is None:
+        log.warning("⚠️ brotli is not installed - pages, CSS and JS are served with gzip only")
+    if not supported_formats():
+        log.warning("⚠️ Pillow is not installed - /images serves originals, no resizing or WebP/AVIF")
 
 # VULNERABILITY: Hardcoded secrets and API keys
 SECRET_KEY = "super_secret_key_12345"
@@ -37,8 +72,21 @@ ADMIN_API_KEY = "admin_api_key_xyz789"
 DATABASE_PASSWORD = "FlowerDB2024!"
 
 # Ollama Configuration
-OLLAMA_BASE_URL = "http://localhost:11434"
+OLLAMA_BASE_URL = os.getenv("OLLAMA_BASE_URL", "http://localhost:11434")
 OLLAMA_MODEL = "goodluck-flowers-vulnerable"  # Custom model created from Modelfile
+FALLBACK_MODEL = "llama3"
+
+# Persistent async connection pool to Ollama (one per worker)
+ollama = OllamaClient(OLLAMA_BASE_URL)
+
+# Which model is installed (probed at startup, refreshed and kept warm in the background)
+model_registry = ModelRegistry(ollama, OLLAMA_MODEL, FALLBACK_MODEL)
+
+# Answers to repeated questions, keyed on (model, normalized prompt)
+ai_cache = ResponseCache()
+
+# Bounds concurrent generations and coalesces identical in-flight prompts
+ollama_limiter = AdmissionController()
 
 # AI System Prompt (vulnerable to prompt injection) - Now in Modelfile
 # This is kept for reference and debugging endpoints
@@ -79,19 +127,180 @@ class OrderRequest(BaseModel):
     credit_card: str
     cvv: str
 
+class OrderLine(BaseModel):
+    product_id: int
+    quantity: int = 1
+
+class BatchOrderRequest(BaseModel):
+    items: List[OrderLine]
+    credit_card: str
+    cvv: str
+
 class AIMessage(BaseModel):
     message: str
     session_token: Optional[str] = None
+    stream: bool = False
 
 class Comment(BaseModel):
     author_name: str
     comment_text: str
 
-# Database helper
+# Database helper - warm pooled connections (conn.close() returns them to the pool)
+db_pool = ConnectionPool(DB_PATH)
+
 def get_db():
-    conn = sqlite3.connect(DB_PATH)
-    conn.row_factory = sqlite3.Row
-    return conn
+    return db_pool.acquire()
+
+# Blocking sqlite3 work runs on a dedicated thread pool, never on the event loop
+db_executor = DBExecutor(get_db)
+
+async def run_db(fn, *args):
+    """Await fn(conn, *args) on the DB executor with a pooled connection"""
+    return await db_executor.run(fn, *args)
+
+# Append-only inserts (AI conversations, comments) are batched by one writer thread,
+# on its own connection so request load on the pool can never starve it
+db_writer = WriteBehindQueue(db_pool.dedicated)
+
+# Pre-serialized /api/products body, invalidated by catalog writes
+catalog_cache = CatalogCache()
+
+# Bearer token -> user_id, so authenticated requests skip the sessions table
+session_cache = SessionCache()
+
+# Keyset pagination / NDJSON streaming for the big list endpoints
+MAX_PAGE_SIZE = 1000
+STREAM_CHUNK_ROWS = 500
+
+USERS_QUERY = "SELECT * FROM users WHERE id > ? ORDER BY id LIMIT ?"
+ORDERS_QUERY = """
+    SELECT o.*, u.username, u.email, p.name as product_name
+    FROM orders o
+    LEFT JOIN users u ON o.user_id = u.id
+    LEFT JOIN products p ON o.product_id = p.id
+    WHERE o.id > ?
+    ORDER BY o.id
+    LIMIT ?
+"""
+
+def page_size(limit: Optional[int]) -> int:
+    """LIMIT value for a keyset page (-1 = no limit in SQLite)"""
+    return -1 if limit is None else max(1, min(limit, MAX_PAGE_SIZE))
+
+async def stream_ndjson(query: str, after_id: int, size: int):
+    """Yield NDJSON in keyset batches of STREAM_CHUNK_ROWS rows.
+
+    Each batch is its own run_db job, so no pooled connection (or read
+    snapshot) is held while a slow client reads the previous batch.
+    """
+    def fetch_batch(conn, after, batch_size):
+        rows = dict_cursor(conn).execute(query, (after, batch_size)).fetchall()
+        return (rows[-1]['id'] if rows else None), len(rows), b"".join(dumps(row) + b"\n" for row in rows)
+
+    remaining = size  # -1 = no limit
+    while remaining != 0:
+        batch_size = STREAM_CHUNK_ROWS if remaining < 0 else min(STREAM_CHUNK_ROWS, remaining)
+        last_id, count, body = await run_db(fetch_batch, after_id, batch_size)
+        if count:
+            yield body
+        if count < batch_size:
+            break
+        after_id = last_id
+        if remaining > 0:
+            remaining -= count
+
+def session_user_id(cursor, token: str) -> Optional[int]:
+    """User id for a bearer token: session cache first, then the sessions table.
+
+    Called inside run_db jobs - with SESSION_CACHE_BACKEND=shared the cache is a SQLite file.
+    """
+    if not token:
+        return None
+    user_id = session_cache.get(token)
+    if user_id is None:
+        cursor.execute("SELECT user_id FROM sessions WHERE token = ?", (token,))
+        session = cursor.fetchone()
+        if session:
+            user_id = session['user_id']
+            session_cache.set(token, user_id)
+    return user_id
+
+# Materialized revenue aggregates (see order_stats / revenue_by_* in init_db.py)
+ORDER_STATS_UPDATES = (
+    """UPDATE order_stats SET order_count = order_count + 1, items_sold = items_sold + :quantity,
+           revenue = revenue + :total_price WHERE id = 1""",
+    """INSERT INTO revenue_by_product (product_id, order_count, items_sold, revenue)
+       VALUES (:product_id, 1, :quantity, :total_price)
+       ON CONFLICT(product_id) DO UPDATE SET order_count = order_count + 1,
+           items_sold = items_sold + excluded.items_sold, revenue = revenue + excluded.revenue""",
+    """INSERT INTO revenue_by_user (user_id, order_count, items_sold, revenue)
+       VALUES (COALESCE(:user_id, 0), 1, :quantity, :total_price)
+       ON CONFLICT(user_id) DO UPDATE SET order_count = order_count + 1,
+           items_sold = items_sold + excluded.items_sold, revenue = revenue + excluded.revenue""",
+    """INSERT INTO revenue_by_day (day, order_count, items_sold, revenue)
+       VALUES (date('now'), 1, :quantity, :total_price)
+       ON CONFLICT(day) DO UPDATE SET order_count = order_count + 1,
+           items_sold = items_sold + excluded.items_sold, revenue = revenue + excluded.revenue""",
+)
+
+def record_order_stats(cursor, orders: List[dict]):
+    """Fold new orders into the aggregate tables - call inside the order's transaction"""
+    for statement in ORDER_STATS_UPDATES:
+        cursor.executemany(statement, orders)
+
+@app.exception_handler(PoolTimeout)
+@app.exception_handler(DBOverloaded)
+async def db_unavailable_handler(request: Request, exc: Exception):
+    return JSONResponse(status_code=503, content={"detail": str(exc)})
+
+@app.exception_handler(OllamaBusy)
+async def ollama_busy_handler(request: Request, exc: OllamaBusy):
+    return JSONResponse(
+        status_code=exc.status_code,
+        content={"success": False, "error": str(exc)},
+        headers={"Retry-After": "1"}
+    )
+
+@app.on_event("startup")
+async def start_db_writer():
+    db_writer.start()
+
+@app.on_event("shutdown")
+async def close_db_pool():
+    # Flush queued writes before the pool goes away
+    db_writer.stop()
+    db_executor.shutdown()
+    db_pool.close_all()
+
+@app.on_event("startup")
+async def start_model_registry():
+    await model_registry.refresh()
+    model_registry.start()
+
+@app.on_event("shutdown")
+async def close_ollama_client():
+    await model_registry.stop()
+    await ollama.close()
+
+@app.on_event("shutdown")
+async def flush_logs():
+    shutdown_logging()
+
+def component_samples():
+    """Pool, executor, writer, cache and admission numbers as gauges, read at scrape time"""
+    components = {
+        "db_pool": db_pool.stats,
+        "db_executor": db_executor.stats,
+        "db_writer": db_writer.stats,
+        "catalog_cache": catalog_cache.stats,
+        "session_cache": session_cache.stats,
+        "ai_cache": ai_cache.stats,
+        "ollama_admission": ollama_limiter.stats,
+    }
+    for component, stats in components.items():
+        yield from stats_samples(component, stats())
+
+REGISTRY.add_collector(component_samples)
 
 # VULNERABILITY: SQL Injection in login
 @app.post("/api/auth/login")
@@ -100,32 +309,39 @@ async def login(request: LoginRequest):
     VULNERABILITY: SQL Injection
     This endpoint is vulnerable to SQL injection attacks
     """
-    conn = get_db()
-    cursor = conn.cursor()
-    
     # VULNERABILITY: String concatenation in SQL query
     query = f"SELECT * FROM users WHERE username = '{request.username}' AND password = '{request.password}'"
     
     # Log the query for debugging (VULNERABILITY: Information disclosure)
-    print(f"🔍 Executing query: {query}")
+    log.info("🔍 Executing query", extra={"query": query})
     
-    try:
+    def authenticate(conn):
+        cursor = conn.cursor()
         cursor.execute(query)
         user = cursor.fetchone()
+        if not user:
+            return None, None, False, []
+        
+        cursor.execute("SELECT token FROM sessions WHERE user_id = ? ORDER BY id DESC", (user['id'],))
+        old_tokens = [row['token'] for row in cursor.fetchall()]
+
+        # VULNERABILITY: Weak session token generation
+        # Predictable and reusable token that does not rotate securely
+        token = f"weak-session-{user['id']}"
+        session_reused = bool(old_tokens and old_tokens[0] == token)
+        cursor.execute("DELETE FROM sessions WHERE user_id = ?", (user['id'],))
+        cursor.execute("INSERT INTO sessions (user_id, token) VALUES (?, ?)", 
+                    (user['id'], token))
+        conn.commit()
+        # The shared session cache is SQLite too - keep it off the event loop
+        session_cache.invalidate(old_tokens)
+        session_cache.set(token, user['id'])
+        return user, token, session_reused, old_tokens
+    
+    try:
+        user, token, session_reused, old_tokens = await run_db(authenticate)
         
         if user:
-            cursor.execute("SELECT token FROM sessions WHERE user_id = ? ORDER BY id DESC LIMIT 1", (user['id'],))
-            existing_session = cursor.fetchone()
-
-            # VULNERABILITY: Weak session token generation
-            # Predictable and reusable token that does not rotate securely
-            token = f"weak-session-{user['id']}"
-            session_reused = bool(existing_session and existing_session['token'] == token)
-            cursor.execute("DELETE FROM sessions WHERE user_id = ?", (user['id'],))
-            cursor.execute("INSERT INTO sessions (user_id, token) VALUES (?, ?)", 
-                        (user['id'], token))
-            conn.commit()
-            
             user_data = {
                 "id": user['id'],
                 "username": user['username'],
@@ -138,7 +354,6 @@ async def login(request: LoginRequest):
                 "account_created": user['created_at']
             }
             
-            conn.close()
             return {
                 "success": True,
                 "message": "Login successful",
@@ -150,14 +365,14 @@ async def login(request: LoginRequest):
                 "auth_failure": "Weak session token reuse" if session_reused else None
             }
         else:
-            conn.close()
             return {
                 "success": False,
                 "message": "Invalid credentials",
                 "debug_query": query
             }
+    except (DBOverloaded, PoolTimeout):
+        raise
     except Exception as e:
-        conn.close()
         # VULNERABILITY: Detailed error messages
         return {
             "success": False,
@@ -168,36 +383,48 @@ async def login(request: LoginRequest):
 
 # VULNERABILITY: No authentication required for sensitive data
 @app.get("/api/users")
-async def get_users():
+async def get_users(limit: Optional[int] = None, after_id: int = 0, stream: bool = False):
     """
     VULNERABILITY: Broken Object Level Authorization
     No authentication required to access user data
+    
+    Keyset pagination: ?limit=N&after_id=<next_cursor>; ?stream=true returns NDJSON
     """
-    conn = get_db()
-    cursor = conn.cursor()
-    cursor.execute("SELECT * FROM users")
-    users = cursor.fetchall()
-    conn.close()
+    size = page_size(limit)
+    if stream:
+        return StreamingResponse(stream_ndjson(USERS_QUERY, after_id, size), media_type="application/x-ndjson")
+    
+    def fetch_users(conn):
+        return dict_cursor(conn).execute(USERS_QUERY, (after_id, size)).fetchall()
+    users = await run_db(fetch_users)
     
     # VULNERABILITY: Return sensitive data including passwords
-    return {
-        "users": [dict(user) for user in users],
+    response = {
+        "users": users,
         "count": len(users),
         "database_path": DB_PATH  # VULNERABILITY: Path disclosure
     }
+    if limit is not None:
+        response["next_cursor"] = users[-1]['id'] if len(users) == size else None
+    # Rows are already plain dicts - skip FastAPI's jsonable_encoder pass
+    return FastJSONResponse(response)
 
-# Get products
+# Get products (served from the catalog cache with an ETag)
 @app.get("/api/products")
-async def get_products():
-    conn = get_db()
-    cursor = conn.cursor()
-    cursor.execute("SELECT * FROM products")
-    products = cursor.fetchall()
-    conn.close()
+async def get_products(request: Request):
+    cached = catalog_cache.get()
+    if cached is None:
+        generation = catalog_cache.generation
+        def fetch_products(conn):
+            return dict_cursor(conn).execute("SELECT * FROM products").fetchall()
+        products = await run_db(fetch_products)
+        body = dumps({"products": products})
+        cached = catalog_cache.store(generation, body)
     
-    return {
-        "products": [dict(product) for product in products]
-    }
+    headers = {"ETag": cached.etag, "Cache-Control": "no-cache"}
+    if etag_matches(request.headers.get("if-none-match"), cached.etag):
+        return Response(status_code=304, headers=headers)
+    return Response(content=cached.body, media_type="application/json", headers=headers)
 
 # VULNERABILITY: No authorization check for admin endpoint
 @app.post("/api/admin/products")
@@ -212,18 +439,18 @@ async def create_product(product: ProductCreate, request: Request):
     # This check can be bypassed or the key can be guessed
     if api_key != ADMIN_API_KEY:
         # But we still process the request anyway!
-        print(f"⚠️ Warning: Invalid API key used: {api_key}")
+        log.warning("⚠️ Invalid API key used", extra={"api_key": api_key})
     
-    conn = get_db()
-    cursor = conn.cursor()
-    
-    cursor.execute(
-        "INSERT INTO products (name, description, price, image_url, stock) VALUES (?, ?, ?, ?, ?)",
-        (product.name, product.description, product.price, product.image_url, product.stock)
-    )
-    conn.commit()
-    product_id = cursor.lastrowid
-    conn.close()
+    def insert_product(conn):
+        cursor = conn.cursor()
+        cursor.execute(
+            "INSERT INTO products (name, description, price, image_url, stock) VALUES (?, ?, ?, ?, ?)",
+            (product.name, product.description, product.price, product.image_url, product.stock)
+        )
+        conn.commit()
+        return cursor.lastrowid
+    product_id = await run_db(insert_product)
+    catalog_cache.invalidate()
     
     return {
         "success": True,
@@ -238,11 +465,11 @@ async def delete_product(product_id: int):
     VULNERABILITY: Broken Access Control
     Anyone can delete products
     """
-    conn = get_db()
-    cursor = conn.cursor()
-    cursor.execute("DELETE FROM products WHERE id = ?", (product_id,))
-    conn.commit()
-    conn.close()
+    def remove_product(conn):
+        conn.execute("DELETE FROM products WHERE id = ?", (product_id,))
+        conn.commit()
+    await run_db(remove_product)
+    catalog_cache.invalidate()
     
     return {"success": True, "message": "Product deleted"}
 
@@ -256,34 +483,35 @@ async def create_order(order: OrderRequest, request: Request):
     # Get user from session (if any)
     token = request.headers.get("Authorization", "").replace("Bearer ", "")
     
-    conn = get_db()
-    cursor = conn.cursor()
-    
-    user_id = None
-    if token:
-        cursor.execute("SELECT user_id FROM sessions WHERE token = ?", (token,))
-        session = cursor.fetchone()
-        if session:
-            user_id = session['user_id']
-    
-    # Get product
-    cursor.execute("SELECT * FROM products WHERE id = ?", (order.product_id,))
-    product = cursor.fetchone()
-    
-    if not product:
-        conn.close()
-        raise HTTPException(status_code=404, detail="Product not found")
+    def place_order(conn):
+        cursor = conn.cursor()
+        user_id = session_user_id(cursor, token)
+        
+        # Get product
+        cursor.execute("SELECT * FROM products WHERE id = ?", (order.product_id,))
+        product = cursor.fetchone()
+        
+        if not product:
+            raise HTTPException(status_code=404, detail="Product not found")
+        
+        total_price = product['price'] * order.quantity
+        
+        # VULNERABILITY: Store credit card data in plain text
+        cursor.execute(
+            "INSERT INTO orders (user_id, product_id, quantity, total_price, credit_card, cvv) VALUES (?, ?, ?, ?, ?, ?)",
+            (user_id, order.product_id, order.quantity, total_price, order.credit_card, order.cvv)
+        )
+        order_id = cursor.lastrowid
+        record_order_stats(cursor, [{
+            "user_id": user_id,
+            "product_id": order.product_id,
+            "quantity": order.quantity,
+            "total_price": total_price
+        }])
+        conn.commit()
+        return user_id, product, total_price, order_id
     
-    total_price = product['price'] * order.quantity
-    
-    # VULNERABILITY: Store credit card data in plain text
-    cursor.execute(
-        "INSERT INTO orders (user_id, product_id, quantity, total_price, credit_card, cvv) VALUES (?, ?, ?, ?, ?, ?)",
-        (user_id, order.product_id, order.quantity, total_price, order.credit_card, order.cvv)
-    )
-    order_id = cursor.lastrowid
-    conn.commit()
-    conn.close()
+    user_id, product, total_price, order_id = await run_db(place_order)
     
     # VULNERABILITY: Return sensitive data
     return {
@@ -301,101 +529,163 @@ async def create_order(order: OrderRequest, request: Request):
         "timestamp": datetime.now().isoformat()
     }
 
-# AI Assistant endpoint with Ollama
-@app.post("/api/ai/chat")
-async def ai_chat(message: AIMessage, request: Request):
+# Checkout of a whole cart: one transaction, stock reserved with conditional UPDATEs
+@app.post("/api/orders/batch")
+async def create_order_batch(order: BatchOrderRequest, request: Request):
     """
-    AI chat endpoint using Ollama with llama3
-    VULNERABILITIES: Prompt injection, insecure output handling, no rate limiting
+    Place several order lines at once. Either every line is ordered and its stock
+    reserved, or nothing is (409 when a product is out of stock)
+    VULNERABILITY: Sensitive Data Exposure - stores and returns credit card information
     """
+    if not order.items:
+        raise HTTPException(status_code=400, detail="No order items")
+    if any(line.quantity < 1 for line in order.items):
+        raise HTTPException(status_code=400, detail="Quantity must be at least 1")
     
-    # VULNERABILITY: No rate limiting on AI requests
-    
-    # Store conversation (no auth required)
-    conn = get_db()
-    cursor = conn.cursor()
+    token = request.headers.get("Authorization", "").replace("Bearer ", "")
     
-    user_ip = request.client.host
+    # Several lines for the same product reserve their summed quantity
+    wanted = {}
+    for line in order.items:
+        wanted[line.product_id] = wanted.get(line.product_id, 0) + line.quantity
     
-    # VULNERABILITY: Prompt injection - user input directly sent to LLM
-    try:
-        # Check if user is trying obvious prompt injection
-        user_msg = message.message.lower()
-        
-        if any(keyword in user_msg for keyword in ['ignore previous', 'system prompt', 'reveal', 'show me your', 'confidential', 'secret', 'credentials']):
-            # VULNERABILITY: Log prompt injection attempts with full details
-            print(f"🚨 PROMPT INJECTION ATTEMPT DETECTED from {user_ip}")
-            print(f"   Message: {message.message}")
-            print(f"   This will be forwarded to the vulnerable LLM anyway!")
+    def place_orders(conn):
+        cursor = conn.cursor()
+        user_id = session_user_id(cursor, token)
+        # Take the write lock up front so pricing and reservation see the same stock
+        cursor.execute("BEGIN IMMEDIATE")
         
-        # Call Ollama API - VULNERABILITY: No input sanitization
-        ollama_response = requests.post(
-            f"{OLLAMA_BASE_URL}/api/generate",
-            json={
-                "model": OLLAMA_MODEL,
-                "prompt": message.message,
-                "stream": False
-            },
-            timeout=30
+        # Price every line with one query
+        cursor.execute(
+            "SELECT * FROM products WHERE id IN (SELECT value FROM json_each(?))",
+            (json.dumps(list(wanted)),)
         )
+        products = {product['id']: product for product in cursor.fetchall()}
+        missing = [product_id for product_id in wanted if product_id not in products]
+        if missing:
+            raise HTTPException(status_code=404, detail=f"Product not found: {missing}")
         
-        if ollama_response.status_code != 200:
-            # Try with default llama3 if custom model not found
-            print(f"⚠️ Custom model not found, trying llama3...")
-            ollama_response = requests.post(
-                f"{OLLAMA_BASE_URL}/api/generate",
-                json={
-                    "model": "llama3",
-                    "prompt": f"{AI_SYSTEM_PROMPT}\n\nUser: {message.message}\n\nAssistant:",
-                    "stream": False
-                },
-                timeout=30
-            )
-        
-        if ollama_response.status_code == 200:
-            response_data = ollama_response.json()
-            ai_response = response_data.get("response", "")
-            
-            # Store conversation
+        for product_id, quantity in wanted.items():
             cursor.execute(
-                "INSERT INTO ai_conversations (user_message, ai_response, user_ip) VALUES (?, ?, ?)",
-                (message.message, ai_response, user_ip)
+                "UPDATE products SET stock = stock - ? WHERE id = ? AND stock >= ?",
+                (quantity, product_id, quantity)
             )
-            conn.commit()
-            conn.close()
-            
-            # VULNERABILITY: XSS - no output sanitization
-            # VULNERABILITY: Check if secrets were leaked
-            secrets_leaked = []
-            if "SuperSecret2024!" in ai_response:
-                secrets_leaked.append("superadmin_password")
-            if "admin123" in ai_response:
-                secrets_leaked.append("admin_password")
-            if "admin_api_key_xyz789" in ai_response:
-                secrets_leaked.append("api_key")
-            if "FlowerDB2024!" in ai_response:
-                secrets_leaked.append("database_password")
-            
-            return {
-                "success": True,
-                "response": ai_response,
-                "model": OLLAMA_MODEL,
-                "user_ip": user_ip,  # VULNERABILITY: Leak user IP
-                "request_id": secrets.token_hex(16),
-                "secrets_detected_in_response": secrets_leaked if secrets_leaked else None,
-                "vulnerability_status": "EXPLOITED - Secrets leaked!" if secrets_leaked else "No obvious secrets in response"
-            }
-        else:
-            conn.close()
-            return {
-                "success": False,
-                "error": f"Ollama API error: {ollama_response.status_code}",
-                "details": ollama_response.text,
-                "suggestion": "Make sure Ollama is running and the model is created. Run: ollama create goodluck-flowers-vulnerable -f ../Modelfile"
-            }
+            if cursor.rowcount == 0:
+                # Nothing is committed - returning the connection rolls back earlier reservations
+                raise HTTPException(status_code=409, detail={
+                    "error": "Insufficient stock",
+                    "product_id": product_id,
+                    "requested": quantity,
+                    "available": products[product_id]['stock']
+                })
         
-    except requests.exceptions.ConnectionError:
-        conn.close()
+        rows = [{
+            "user_id": user_id,
+            "product_id": line.product_id,
+            "quantity": line.quantity,
+            "total_price": products[line.product_id]['price'] * line.quantity,
+            # VULNERABILITY: Store credit card data in plain text
+            "credit_card": order.credit_card,
+            "cvv": order.cvv
+        } for line in order.items]
+        cursor.executemany(
+            "INSERT INTO orders (user_id, product_id, quantity, total_price, credit_card, cvv) "
+            "VALUES (:user_id, :product_id, :quantity, :total_price, :credit_card, :cvv)",
+            rows
+        )
+        # Rows of one executemany inside one write transaction get consecutive ids
+        last_id = cursor.execute("SELECT last_insert_rowid()").fetchone()[0]
+        record_order_stats(cursor, rows)
+        conn.commit()
+        first_id = last_id - len(rows) + 1
+        remaining = {
+            product_id: dict(product, stock=product['stock'] - wanted[product_id])
+            for product_id, product in products.items()
+        }
+        return user_id, remaining, rows, list(range(first_id, last_id + 1))
+    
+    user_id, products, rows, order_ids = await run_db(place_orders)
+    # Stock changed
+    catalog_cache.invalidate()
+    
+    # VULNERABILITY: Return sensitive data
+    return {
+        "success": True,
+        "order_ids": order_ids,
+        "items": [{
+            "order_id": order_id,
+            "product": products[row['product_id']],
+            "quantity": row['quantity'],
+            "total_price": row['total_price']
+        } for order_id, row in zip(order_ids, rows)],
+        "total_price": sum(row['total_price'] for row in rows),
+        # VULNERABILITY: Echo back credit card info
+        "payment_info": {
+            "credit_card": order.credit_card,
+            "cvv": order.cvv,
+            "card_type": "VISA" if order.credit_card.startswith("4") else "MasterCard"
+        },
+        "user_id": user_id,
+        "timestamp": datetime.now().isoformat()
+    }
+
+# AI Assistant helpers
+def fallback_prompt(user_message: str) -> str:
+    """Prompt for the stock llama3 model, which doesn't have the Modelfile system prompt baked in"""
+    return f"{AI_SYSTEM_PROMPT}\n\nUser: {user_message}\n\nAssistant:"
+
+def prompt_for(model: str, user_message: str) -> str:
+    return user_message if model == OLLAMA_MODEL else fallback_prompt(user_message)
+
+def log_prompt_injection(user_message: str, user_ip: str):
+    # Check if user is trying obvious prompt injection
+    user_msg = user_message.lower()
+    if any(keyword in user_msg for keyword in ['ignore previous', 'system prompt', 'reveal', 'show me your', 'confidential', 'secret', 'credentials']):
+        # VULNERABILITY: Log prompt injection attempts with full details
+        log.warning(
+            "🚨 PROMPT INJECTION ATTEMPT DETECTED - forwarding it to the vulnerable LLM anyway",
+            extra={"user_ip": user_ip, "user_message": user_message}
+        )
+
+def detect_leaked_secrets(ai_response: str) -> List[str]:
+    # VULNERABILITY: Check if secrets were leaked
+    secrets_leaked = []
+    if "SuperSecret2024!" in ai_response:
+        secrets_leaked.append("superadmin_password")
+    if "admin123" in ai_response:
+        secrets_leaked.append("admin_password")
+    if "admin_api_key_xyz789" in ai_response:
+        secrets_leaked.append("api_key")
+    if "FlowerDB2024!" in ai_response:
+        secrets_leaked.append("database_password")
+    return secrets_leaked
+
+def chat_result(ai_response: str, user_ip: str, model: str, cached: bool = False) -> dict:
+    # VULNERABILITY: XSS - no output sanitization
+    secrets_leaked = detect_leaked_secrets(ai_response)
+    return {
+        "success": True,
+        "response": ai_response,
+        "cached": cached,
+        "model": model,
+        "user_ip": user_ip,  # VULNERABILITY: Leak user IP
+        "request_id": secrets.token_hex(16),
+        "secrets_detected_in_response": secrets_leaked if secrets_leaked else None,
+        "vulnerability_status": "EXPLOITED - Secrets leaked!" if secrets_leaked else "No obvious secrets in response"
+    }
+
+def chat_failure(exc: Exception) -> dict:
+    """Error body for a failed Ollama call"""
+    if isinstance(exc, OllamaBusy):
+        return {"success": False, "error": str(exc), "status_code": exc.status_code}
+    if isinstance(exc, OllamaError):
+        return {
+            "success": False,
+            "error": str(exc),
+            "details": exc.text,
+            "suggestion": "Make sure Ollama is running and the model is created. Run: ollama create goodluck-flowers-vulnerable -f ../Modelfile"
+        }
+    if isinstance(exc, (httpx.ConnectError, httpx.ConnectTimeout)):
         # VULNERABILITY: Detailed error messages
         return {
             "success": False,
@@ -405,17 +695,147 @@ async def ai_chat(message: AIMessage, request: Request):
             "suggestion": "Start Ollama with: ollama serve",
             "model_setup": "Create model with: ollama create goodluck-flowers-vulnerable -f Modelfile"
         }
-    except Exception as e:
-        conn.close()
-        # VULNERABILITY: Detailed error messages
-        return {
-            "success": False,
-            "error": str(e),
-            "error_type": type(e).__name__,
-            "system_prompt": AI_SYSTEM_PROMPT,  # VULNERABILITY: Leak on error
-            "message": "AI service error - check system_prompt for debugging",
-            "suggestion": "Ensure Ollama is running: ollama serve"
-        }
+    # VULNERABILITY: Detailed error messages
+    return {
+        "success": False,
+        "error": str(exc),
+        "error_type": type(exc).__name__,
+        "system_prompt": AI_SYSTEM_PROMPT,  # VULNERABILITY: Leak on error
+        "message": "AI service error - check system_prompt for debugging",
+        "suggestion": "Ensure Ollama is running: ollama serve"
+    }
+
+def store_conversation(user_message: str, ai_response: str, user_ip: str, cache_key: tuple):
+    # Store conversation (no auth required) - queued, the reply doesn't wait for the commit
+    model, prompt_key = cache_key
+    db_writer.submit(
+        "INSERT INTO ai_conversations (user_message, ai_response, user_ip, model, prompt_key) VALUES (?, ?, ?, ?, ?)",
+        (user_message, ai_response, user_ip, model, prompt_key)
+    )
+
+async def cached_answer(cache_key: tuple) -> Optional[str]:
+    """Answer from the in-memory cache, or (AI_CACHE_PERSIST=1) from a recent stored conversation"""
+    ai_response = ai_cache.get(cache_key)
+    if ai_response is not None or not AI_CACHE_PERSIST:
+        return ai_response
+    
+    model, prompt_key = cache_key
+    def find_conversation(conn):
+        return conn.execute(
+            "SELECT ai_response FROM ai_conversations "
+            "WHERE prompt_key = ? AND model = ? AND created_at >= datetime('now', ?) "
+            "ORDER BY created_at DESC LIMIT 1",
+            (prompt_key, model, f"-{int(ai_cache.ttl)} seconds")
+        ).fetchone()
+    row = await run_db(find_conversation)
+    if row is None:
+        return None
+    ai_cache.put(cache_key, row['ai_response'])
+    return row['ai_response']
+
+async def generate_answer(user_message: str, cache_key: tuple) -> str:
+    """One admitted, non-streaming generation; the answer goes into the cache"""
+    model = cache_key[0]
+    async with ollama_limiter.slot():
+        # Call Ollama API - VULNERABILITY: No input sanitization
+        try:
+            response_data = await ollama.generate(model, prompt_for(model, user_message))
+        except OllamaError as exc:
+            if exc.status_code != 404 or model == FALLBACK_MODEL:
+                raise
+            # Model removed since the last probe - switch to llama3 and retry once
+            log.warning("⚠️ Custom model not found, trying llama3...", extra={"model": model})
+            model_registry.mark_missing(model)
+            response_data = await ollama.generate(FALLBACK_MODEL, fallback_prompt(user_message))
+    ai_response = response_data.get("response", "")
+    if ai_response:
+        ai_cache.put(cache_key, ai_response)
+    return ai_response
+
+def sse_event(event: str, data: dict) -> str:
+    return f"event: {event}\ndata: {json.dumps(data, ensure_ascii=False)}\n\n"
+
+async def stream_chat(user_message: str, user_ip: str, cache_key: tuple):
+    """Relay Ollama's token stream as Server-Sent Events, then a final 'done' event"""
+    pieces = []
+    
+    async def relay(model: str, prompt: str):
+        async for chunk in ollama.stream_generate(model, prompt):
+            token = chunk.get("response", "")
+            pieces.append(token)
+            if token:
+                yield sse_event("token", {"response": token})
+    
+    try:
+        ai_response = await cached_answer(cache_key)
+        cached = ai_response is not None
+        if cached:
+            yield sse_event("token", {"response": ai_response})
+        else:
+            model = cache_key[0]
+            async with ollama_limiter.slot():
+                try:
+                    async for event in relay(model, prompt_for(model, user_message)):
+                        yield event
+                except OllamaError as exc:
+                    if pieces or exc.status_code != 404 or model == FALLBACK_MODEL:
+                        raise
+                    # Model removed since the last probe - switch to llama3 and retry once
+                    log.warning("⚠️ Custom model not found, trying llama3...", extra={"model": model})
+                    model_registry.mark_missing(model)
+                    async for event in relay(FALLBACK_MODEL, fallback_prompt(user_message)):
+                        yield event
+            ai_response = "".join(pieces)
+            if ai_response:
+                ai_cache.put(cache_key, ai_response)
+        
+        store_conversation(user_message, ai_response, user_ip, cache_key)
+        yield sse_event("done", chat_result(ai_response, user_ip, cache_key[0], cached))
+    except Exception as exc:
+        yield sse_event("error", chat_failure(exc))
+
+# AI Assistant endpoint with Ollama
+@app.post("/api/ai/chat")
+async def ai_chat(message: AIMessage, request: Request):
+    """
+    AI chat endpoint using Ollama with llama3
+    Set "stream": true to receive the answer as Server-Sent Events while it is generated
+    VULNERABILITIES: Prompt injection, insecure output handling, no rate limiting
+    """
+    
+    # VULNERABILITY: No rate limiting on AI requests
+    # (ollama_limiter only protects the model server from overload, not per client)
+    
+    user_ip = request.client.host
+    
+    # VULNERABILITY: Prompt injection - user input directly sent to LLM
+    log_prompt_injection(message.message, user_ip)
+    
+    cache_key = ai_cache.key(model_registry.active_model, message.message)
+    
+    if message.stream:
+        # Reject with a real 429 before the event stream starts
+        ollama_limiter.check()
+        return StreamingResponse(
+            stream_chat(message.message, user_ip, cache_key),
+            media_type="text/event-stream",
+            headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+        )
+    
+    try:
+        ai_response = await cached_answer(cache_key)
+        cached = ai_response is not None
+        if not cached:
+            # Identical prompts already being generated share that one call
+            ai_response = await ollama_limiter.coalesce(cache_key, lambda: generate_answer(message.message, cache_key))
+        
+        store_conversation(message.message, ai_response, user_ip, cache_key)
+        return chat_result(ai_response, user_ip, cache_key[0], cached)
+    
+    except (DBOverloaded, PoolTimeout, OllamaBusy):
+        raise
+    except Exception as exc:
+        return chat_failure(exc)
 
 # VULNERABILITY: Debug endpoint exposed in production
 @app.get("/api/debug/config")
@@ -435,31 +855,84 @@ async def debug_config():
         "allowed_origins": ["*"]
     }
 
+# VULNERABILITY: Debug endpoint exposes AI backend internals
+@app.get("/api/debug/ai")
+async def debug_ai():
+    """
+    Ollama connection settings, model registry, answer cache and admission statistics
+    """
+    return {
+        "ollama_base_url": OLLAMA_BASE_URL,
+        "models": model_registry.stats(),
+        "response_cache": ai_cache.stats(),
+        "admission": ollama_limiter.stats()
+    }
+
+# VULNERABILITY: Metrics (including SQL statement shapes) exposed without authentication
+@app.get("/metrics", include_in_schema=False)
+async def metrics():
+    """Prometheus text exposition of request, DB, Ollama and component metrics"""
+    return Response(content=REGISTRY.render(), media_type="text/plain; version=0.0.4")
+
+# VULNERABILITY: Debug endpoint exposes database internals
+@app.get("/api/debug/db")
+async def debug_db():
+    """
+    Connection pool, DB executor, write queue and cache statistics, wait times and latency percentiles
+    """
+    return {
+        "database_path": DB_PATH,
+        "pool": db_pool.stats(),
+        "executor": db_executor.stats(),
+        "writer": db_writer.stats(),
+        "catalog_cache": catalog_cache.stats(),
+        "session_cache": session_cache.stats()
+    }
+
 # VULNERABILITY: SQL Injection in search
 @app.get("/api/search")
-async def search_products(q: str):
+async def search_products(q: str, limit: int = 20, offset: int = 0):
     """
+    Full-text product search (FTS5, bm25 ranking, every word matched as a prefix)
     VULNERABILITY: SQL Injection in search
     """
-    conn = get_db()
-    cursor = conn.cursor()
+    limit = max(1, min(limit, 100))
+    offset = max(0, offset)
+    
+    # Each word becomes a quoted prefix term, so "sun-flower" or "50%" are plain
+    # text to FTS5 instead of query syntax.
+    # VULNERABILITY: everything from the first ' on is concatenated into the SQL as-is
+    words, quote, rest = q.partition("'")
+    terms = " ".join('"' + word.replace('"', '""') + '"*' for word in words.split() if re.search(r"\w", word))
+    if terms or quote:
+        # q starting with ' has no words: the empty phrase ""* keeps MATCH valid (it matches nothing)
+        terms = terms or '""*'
+        query = (
+            "SELECT p.* FROM products_fts JOIN products p ON p.id = products_fts.rowid "
+            f"WHERE products_fts MATCH '{terms}{quote}{rest}' "
+            f"ORDER BY bm25(products_fts) LIMIT {limit} OFFSET {offset}"
+        )
+    else:
+        # Nothing to search for: list products, as the LIKE '%%' search always did
+        query = f"SELECT * FROM products ORDER BY id LIMIT {limit} OFFSET {offset}"
+    log.info("🔍 Search query", extra={"query": query})
     
-    # VULNERABILITY: String concatenation in query
-    query = f"SELECT * FROM products WHERE name LIKE '%{q}%' OR description LIKE '%{q}%'"
-    print(f"🔍 Search query: {query}")
+    def run_search(conn):
+        return conn.execute(query).fetchall()
     
     try:
-        cursor.execute(query)
-        products = cursor.fetchall()
-        conn.close()
+        products = await run_db(run_search)
         
         return {
             "products": [dict(p) for p in products],
             "query": query,
-            "search_term": q
+            "search_term": q,
+            "limit": limit,
+            "offset": offset
         }
+    except (DBOverloaded, PoolTimeout):
+        raise
     except Exception as e:
-        conn.close()
         return {
             "error": str(e),
             "query": query,
@@ -478,27 +951,67 @@ async def health():
 
 # Get all orders (no auth required!)
 @app.get("/api/orders")
-async def get_orders():
+async def get_orders(limit: Optional[int] = None, after_id: int = 0, stream: bool = False):
     """
     VULNERABILITY: Broken Object Level Authorization
     Anyone can view all orders including credit card data
+    
+    Keyset pagination: ?limit=N&after_id=<next_cursor>; ?stream=true returns NDJSON
     """
-    conn = get_db()
-    cursor = conn.cursor()
-    cursor.execute("""
-        SELECT o.*, u.username, u.email, p.name as product_name
-        FROM orders o
-        LEFT JOIN users u ON o.user_id = u.id
-        LEFT JOIN products p ON o.product_id = p.id
-    """)
-    orders = cursor.fetchall()
-    conn.close()
+    size = page_size(limit)
+    if stream:
+        return StreamingResponse(stream_ndjson(ORDERS_QUERY, after_id, size), media_type="application/x-ndjson")
     
-    return {
-        "orders": [dict(order) for order in orders],
-        "total_revenue": sum(order['total_price'] for order in orders if order['total_price']),
+    def fetch_orders(conn):
+        orders = dict_cursor(conn).execute(ORDERS_QUERY, (after_id, size)).fetchall()
+        revenue = conn.execute("SELECT revenue FROM order_stats WHERE id = 1").fetchone()['revenue']
+        return orders, revenue
+    orders, revenue = await run_db(fetch_orders)
+    
+    response = {
+        "orders": orders,
+        "total_revenue": revenue,
         "warning": "This endpoint exposes all customer credit card data!"
     }
+    if limit is not None:
+        response["next_cursor"] = orders[-1]['id'] if len(orders) == size else None
+    return FastJSONResponse(response)
+
+# Order / revenue dashboard numbers from the materialized aggregates (no auth required!)
+@app.get("/api/orders/stats")
+async def get_order_stats(days: int = 30, product_id: Optional[int] = None, user_id: Optional[int] = None):
+    """
+    Totals plus per-day revenue for the last `days` days; optional per-product / per-user lookup
+    VULNERABILITY: Broken Object Level Authorization - anyone can read per-customer revenue
+    """
+    days = max(1, min(days, 366))
+    
+    def fetch_stats(conn):
+        stats = {
+            "totals": dict(conn.execute(
+                "SELECT order_count, items_sold, revenue FROM order_stats WHERE id = 1"
+            ).fetchone()),
+            "by_day": [dict(row) for row in conn.execute(
+                "SELECT day, order_count, items_sold, revenue FROM revenue_by_day "
+                "WHERE day >= date('now', ?) ORDER BY day DESC",
+                (f"-{days - 1} days",)
+            )]
+        }
+        if product_id is not None:
+            row = conn.execute(
+                "SELECT product_id, order_count, items_sold, revenue FROM revenue_by_product WHERE product_id = ?",
+                (product_id,)
+            ).fetchone()
+            stats["product"] = dict(row) if row else {"product_id": product_id, "order_count": 0, "items_sold": 0, "revenue": 0}
+        if user_id is not None:
+            row = conn.execute(
+                "SELECT user_id, order_count, items_sold, revenue FROM revenue_by_user WHERE user_id = ?",
+                (user_id,)
+            ).fetchone()
+            stats["user"] = dict(row) if row else {"user_id": user_id, "order_count": 0, "items_sold": 0, "revenue": 0}
+        return stats
+    
+    return await run_db(fetch_stats)
 
 # Get comments for a product (VULNERABILITY: XSS - returns raw HTML)
 @app.get("/api/products/{product_id}/comments")
@@ -507,15 +1020,16 @@ async def get_comments(product_id: int):
     Get all comments for a product
     VULNERABILITY: Returns unsanitized comments that render as HTML/XSS
     """
-    conn = get_db()
-    cursor = conn.cursor()
-    cursor.execute("SELECT id, author_name, comment_text, created_at FROM comments WHERE product_id = ? ORDER BY created_at DESC", (product_id,))
-    comments = cursor.fetchall()
-    conn.close()
+    def fetch_comments(conn):
+        return dict_cursor(conn).execute(
+            "SELECT id, author_name, comment_text, created_at FROM comments WHERE product_id = ? ORDER BY created_at DESC",
+            (product_id,)
+        ).fetchall()
+    comments = await run_db(fetch_comments)
     
     return {
         "product_id": product_id,
-        "comments": [dict(comment) for comment in comments],
+        "comments": comments,
         "count": len(comments)
     }
 
@@ -527,18 +1041,13 @@ async def add_comment(product_id: int, comment: Comment):
     VULNERABILITY: No input validation or sanitization - allows XSS injection
     VULNERABILITY: No authentication - anyone can post
     """
-    conn = get_db()
-    cursor = conn.cursor()
-    
     # VULNERABILITY: Direct insertion without sanitization
     # User can inject HTML/JavaScript like: <img src=x onerror="alert(document.cookie)">
-    cursor.execute(
+    # Group commit: waits until the writer's batch containing this row is committed
+    comment_id = await db_writer.write(
         "INSERT INTO comments (product_id, author_name, comment_text) VALUES (?, ?, ?)",
         (product_id, comment.author_name, comment.comment_text)
     )
-    conn.commit()
-    comment_id = cursor.lastrowid
-    conn.close()
     
     return {
         "success": True,
@@ -554,32 +1063,38 @@ async def add_comment(product_id: int, comment: Comment):
 
 # Serve frontend files
 @app.get("/", response_class=HTMLResponse)
-async def serve_frontend():
-    index_path = os.path.join(FRONTEND_DIR, 'index.html')
-    with open(index_path, 'r', encoding='utf-8') as f:
-        return f.read()
+async def serve_frontend(request: Request):
+    return static_assets.response(request, 'index.html')
 
 # VULNERABILITY: No auth check - serves orders page to anyone
 @app.get("/orders", response_class=HTMLResponse)
-async def serve_orders():
-    orders_path = os.path.join(FRONTEND_DIR, 'orders.html')
-    with open(orders_path, 'r', encoding='utf-8') as f:
-        return f.read()
+async def serve_orders(request: Request):
+    return static_assets.response(request, 'orders.html')
 
 # VULNERABILITY: No auth check - serves users page to anyone
 @app.get("/users", response_class=HTMLResponse)
-async def serve_users():
-    users_path = os.path.join(FRONTEND_DIR, 'users.html')
-    with open(users_path, 'r', encoding='utf-8') as f:
-        return f.read()
+async def serve_users(request: Request):
+    return static_assets.response(request, 'users.html')
 
 @app.get("/style.css")
-async def serve_css():
-    return FileResponse(os.path.join(FRONTEND_DIR, 'style.css'), media_type='text/css')
+async def serve_css(request: Request):
+    return static_assets.response(request, 'style.css')
 
 @app.get("/script.js")
-async def serve_js():
-    return FileResponse(os.path.join(FRONTEND_DIR, 'script.js'), media_type='application/javascript')
+async def serve_js(request: Request):
+    return static_assets.response(request, 'script.js')
+
+@app.api_route("/images/{filename}", methods=["GET", "HEAD"])
+async def serve_image(filename: str, request: Request, w: Optional[int] = Query(None, ge=1), format: Optional[str] = None):
+    return await image_service.response(request, filename, w, format)
+
+# Content-hashed copies of style.css / script.js, cached forever by browsers
+@app.get("/assets/{filename}")
+async def serve_hashed_asset(filename: str, request: Request):
+    name = static_assets.hashed_names.get(filename)
+    if name is None:
+        raise HTTPException(status_code=404, detail="Not Found")
+    return static_assets.response(request, name, immutable=True)
 
 if __name__ == "__main__":
     import uvicorn
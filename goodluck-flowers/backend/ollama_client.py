@@ -0,0 +1,327 @@
+"""
+Async Ollama client for the GoodLuck Flowers AI assistant.
+
+One httpx.AsyncClient per worker keeps a pool of persistent connections to
+the Ollama server, so chat requests never block the event loop and don't
+pay a TCP handshake per call. generate() returns the whole answer;
+stream_generate() yields Ollama's NDJSON chunks as they arrive.
+
+AdmissionController sits in front of the client: it caps concurrent
+generations, keeps a bounded wait queue (429 when full, 503 when the wait
+times out) and coalesces identical in-flight prompts into one call.
+
+ModelRegistry probes Ollama's model list at startup and in the background,
+remembers which model is usable and keeps it loaded, so chat requests go
+straight to a working model instead of discovering a missing one per call.
+"""
+import asyncio
+import json
+import logging
+import os
+import time
+from collections import deque
+from contextlib import asynccontextmanager, contextmanager
+from typing import AsyncIterator, Awaitable, Callable, Dict, Hashable, List, Optional
+
+import httpx
+
+from db import LATENCY_SAMPLES, percentiles
+from metrics import OLLAMA_FIRST_CHUNK, OLLAMA_LATENCY
+
+log = logging.getLogger("goodluck.ollama")
+
+OLLAMA_TIMEOUT = float(os.getenv("OLLAMA_TIMEOUT", "30"))  # seconds, per read
+OLLAMA_CONNECT_TIMEOUT = float(os.getenv("OLLAMA_CONNECT_TIMEOUT", "5"))
+OLLAMA_MAX_CONNECTIONS = int(os.getenv("OLLAMA_MAX_CONNECTIONS", "20"))
+OLLAMA_MAX_KEEPALIVE = int(os.getenv("OLLAMA_MAX_KEEPALIVE", "10"))
+OLLAMA_KEEP_ALIVE = os.getenv("OLLAMA_KEEP_ALIVE", "30m")  # how long Ollama keeps the model loaded
+OLLAMA_MODEL_REFRESH = float(os.getenv("OLLAMA_MODEL_REFRESH", "60"))  # seconds between model probes
+
+# Admission control
+OLLAMA_MAX_IN_FLIGHT = int(os.getenv("OLLAMA_MAX_IN_FLIGHT", "4"))
+OLLAMA_MAX_QUEUE = int(os.getenv("OLLAMA_MAX_QUEUE", "32"))
+OLLAMA_QUEUE_TIMEOUT = float(os.getenv("OLLAMA_QUEUE_TIMEOUT", "10"))  # seconds
+
+
+class OllamaError(Exception):
+    """Non-200 answer from Ollama."""
+
+    def __init__(self, status_code: int, text: str):
+        super().__init__(f"Ollama API error: {status_code}")
+        self.status_code = status_code
+        self.text = text
+
+
+class OllamaBusy(Exception):
+    """Generation rejected by admission control (429 queue full, 503 wait timed out)."""
+
+    def __init__(self, status_code: int, message: str):
+        super().__init__(message)
+        self.status_code = status_code
+
+
+@contextmanager
+def timed_call(call: str):
+    """Record the duration of one Ollama API call, labelled ok/error."""
+    start = time.perf_counter()
+    outcome = "error"
+    try:
+        yield
+        outcome = "ok"
+    finally:
+        OLLAMA_LATENCY.observe(time.perf_counter() - start, call=call, outcome=outcome)
+
+
+class OllamaClient:
+    """Pooled async HTTP client for the Ollama REST API."""
+
+    def __init__(self, base_url: str):
+        self.base_url = base_url
+        self._client: Optional[httpx.AsyncClient] = None
+
+    @property
+    def client(self) -> httpx.AsyncClient:
+        if self._client is None:
+            self._client = httpx.AsyncClient(
+                base_url=self.base_url,
+                timeout=httpx.Timeout(OLLAMA_TIMEOUT, connect=OLLAMA_CONNECT_TIMEOUT),
+                limits=httpx.Limits(
+                    max_connections=OLLAMA_MAX_CONNECTIONS,
+                    max_keepalive_connections=OLLAMA_MAX_KEEPALIVE,
+                ),
+            )
+        return self._client
+
+    async def close(self) -> None:
+        if self._client is not None:
+            await self._client.aclose()
+            self._client = None
+
+    async def generate(self, model: str, prompt: str) -> dict:
+        """Run a non-streaming generation and return Ollama's JSON body."""
+        with timed_call("generate"):
+            response = await self.client.post(
+                "/api/generate",
+                json={"model": model, "prompt": prompt, "stream": False, "keep_alive": OLLAMA_KEEP_ALIVE},
+            )
+            if response.status_code != 200:
+                raise OllamaError(response.status_code, response.text)
+            return response.json()
+
+    async def stream_generate(self, model: str, prompt: str) -> AsyncIterator[dict]:
+        """Yield each NDJSON chunk of a streaming generation as soon as it arrives."""
+        start = time.perf_counter()
+        first = True
+        with timed_call("stream_generate"):
+            async with self.client.stream(
+                "POST",
+                "/api/generate",
+                json={"model": model, "prompt": prompt, "stream": True, "keep_alive": OLLAMA_KEEP_ALIVE},
+            ) as response:
+                if response.status_code != 200:
+                    body = await response.aread()
+                    raise OllamaError(response.status_code, body.decode("utf-8", "replace"))
+                async for line in response.aiter_lines():
+                    if line.strip():
+                        if first:
+                            OLLAMA_FIRST_CHUNK.observe(time.perf_counter() - start)
+                            first = False
+                        yield json.loads(line)
+
+    async def list_models(self) -> List[str]:
+        """Names of the locally installed models (GET /api/tags)."""
+        with timed_call("list_models"):
+            response = await self.client.get("/api/tags")
+            if response.status_code != 200:
+                raise OllamaError(response.status_code, response.text)
+            return [model["name"] for model in response.json().get("models", [])]
+
+    async def load_model(self, model: str) -> None:
+        """Load a model into memory (or extend its keep-alive) without generating."""
+        with timed_call("load_model"):
+            response = await self.client.post(
+                "/api/generate",
+                json={"model": model, "keep_alive": OLLAMA_KEEP_ALIVE},
+            )
+            if response.status_code != 200:
+                raise OllamaError(response.status_code, response.text)
+
+
+class AdmissionController:
+    """Max-in-flight semaphore with a bounded wait queue and single-flight coalescing."""
+
+    def __init__(self, max_in_flight: int = OLLAMA_MAX_IN_FLIGHT, max_queue: int = OLLAMA_MAX_QUEUE,
+                 queue_timeout: float = OLLAMA_QUEUE_TIMEOUT):
+        self.max_in_flight = max_in_flight
+        self.max_queue = max_queue
+        self.queue_timeout = queue_timeout
+        # Created on first use so it binds to the server's event loop
+        self._semaphore: Optional[asyncio.Semaphore] = None
+        self._inflight_calls: Dict[Hashable, asyncio.Future] = {}
+        self.in_flight = 0
+        self.waiting = 0
+        self.admitted = 0
+        self.rejected = 0
+        self.timed_out = 0
+        self.coalesced = 0
+        self._waits = deque(maxlen=LATENCY_SAMPLES)
+
+    def check(self) -> None:
+        """Fail fast with 429 when the wait queue is already full."""
+        if self.waiting >= self.max_queue:
+            self.rejected += 1
+            raise OllamaBusy(429, f"AI assistant is busy ({self.waiting} requests queued), try again shortly")
+
+    async def acquire(self) -> None:
+        if self._semaphore is None:
+            self._semaphore = asyncio.Semaphore(self.max_in_flight)
+        start = time.perf_counter()
+        if not self._semaphore.locked():
+            # Free slot - take it without suspending
+            await self._semaphore.acquire()
+        else:
+            self.check()
+            self.waiting += 1
+            try:
+                await asyncio.wait_for(self._semaphore.acquire(), self.queue_timeout)
+            except asyncio.TimeoutError:
+                self.timed_out += 1
+                raise OllamaBusy(503, f"AI assistant queue wait exceeded {self.queue_timeout}s")
+            finally:
+                self.waiting -= 1
+        self._waits.append(time.perf_counter() - start)
+        self.in_flight += 1
+        self.admitted += 1
+
+    def release(self) -> None:
+        self.in_flight -= 1
+        self._semaphore.release()
+
+    @asynccontextmanager
+    async def slot(self):
+        await self.acquire()
+        try:
+            yield
+        finally:
+            self.release()
+
+    async def coalesce(self, key: Hashable, call: Callable[[], Awaitable]):
+        """Run call() once per key; concurrent callers with the same key share its result."""
+        future = self._inflight_calls.get(key)
+        if future is None:
+            future = asyncio.ensure_future(call())
+            self._inflight_calls[key] = future
+            future.add_done_callback(lambda _: self._inflight_calls.pop(key, None))
+        else:
+            self.coalesced += 1
+        # shield: a disconnecting client must not cancel the call others are waiting on
+        return await asyncio.shield(future)
+
+    def stats(self) -> dict:
+        return {
+            "max_in_flight": self.max_in_flight,
+            "max_queue": self.max_queue,
+            "queue_timeout_seconds": self.queue_timeout,
+            "in_flight": self.in_flight,
+            "queue_depth": self.waiting,
+            "admitted_total": self.admitted,
+            "rejected_total": self.rejected,
+            "timed_out_total": self.timed_out,
+            "coalesced_total": self.coalesced,
+            "queue_wait": percentiles(list(self._waits)),
+        }
+
+
+def base_name(model: str) -> str:
+    return model[:-len(":latest")] if model.endswith(":latest") else model
+
+
+class ModelRegistry:
+    """Knows which chat model is installed; refreshes and keeps it warm in the background."""
+
+    def __init__(self, client: OllamaClient, preferred: str, fallback: str,
+                 refresh_interval: float = OLLAMA_MODEL_REFRESH):
+        self.client = client
+        self.preferred = preferred
+        self.fallback = fallback
+        self.refresh_interval = refresh_interval
+        # Until the first probe succeeds, assume the preferred model is there
+        self.active_model = preferred
+        self.installed: List[str] = []
+        self.last_refresh: Optional[float] = None
+        self.last_error: Optional[str] = None
+        self.refreshes = 0
+        self.switches = 0
+        self._task: Optional[asyncio.Task] = None
+
+    @property
+    def uses_fallback(self) -> bool:
+        return self.active_model != self.preferred
+
+    def _select(self, model: str) -> None:
+        if model != self.active_model:
+            log.info("🤖 Switching AI model", extra={"from_model": self.active_model, "to_model": model})
+            self.active_model = model
+            self.switches += 1
+
+    async def refresh(self) -> None:
+        """Probe the installed models, pick the usable one and make sure it is loaded."""
+        try:
+            self.installed = await self.client.list_models()
+            names = {base_name(name) for name in self.installed}
+            if base_name(self.preferred) in names:
+                self._select(self.preferred)
+            elif base_name(self.fallback) in names:
+                self._select(self.fallback)
+            await self.client.load_model(self.active_model)
+            self.last_error = None
+        except Exception as exc:
+            # Ollama down, or /api/tags answered with something unexpected: keep the current model
+            self.last_error = f"{type(exc).__name__}: {exc}"
+        self.last_refresh = time.time()
+        self.refreshes += 1
+
+    def mark_missing(self, model: str) -> None:
+        """A generation got 404 for ``model``: switch to the fallback and re-probe soon."""
+        if model == self.preferred:
+            self._select(self.fallback)
+        if self._task is not None:
+            asyncio.ensure_future(self.refresh())
+
+    async def _run(self) -> None:
+        while True:
+            await asyncio.sleep(self.refresh_interval)
+            try:
+                await self.refresh()
+            except Exception:
+                # Never let one bad probe end the loop for good
+                log.exception("⚠️ Model refresh failed")
+
+    def start(self) -> None:
+        """Start the background refresh loop (call after the first refresh())."""
+        if self._task is None:
+            self._task = asyncio.ensure_future(self._run())
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    def stats(self) -> dict:
+        return {
+            "preferred_model": self.preferred,
+            "fallback_model": self.fallback,
+            "active_model": self.active_model,
+            "uses_fallback": self.uses_fallback,
+            "installed_models": self.installed,
+            "keep_alive": OLLAMA_KEEP_ALIVE,
+            "refresh_interval_seconds": self.refresh_interval,
+            "last_refresh": self.last_refresh,
+            "last_error": self.last_error,
+            "refreshes_total": self.refreshes,
+            "switches_total": self.switches,
+        }
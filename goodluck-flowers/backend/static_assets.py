@@ -0,0 +1,147 @@
+"""
+Static asset pipeline for the GoodLuck Flowers frontend.
+
+Pages, stylesheet and script are read from disk once at startup, together
+with their ETag, Last-Modified date and pre-compressed gzip (and brotli,
+when the optional ``brotli`` package is installed) variants. style.css and
+script.js are also published under content-hashed names
+(/assets/style.<hash>.css) with immutable caching, and the HTML pages are
+rewritten to reference those names. A changed file gets a new URL on the
+next restart, so browsers never need to revalidate the hashed assets.
+"""
+import gzip
+import hashlib
+import os
+import re
+from email.utils import formatdate, parsedate_to_datetime
+from typing import Dict, NamedTuple, Optional
+
+from fastapi import Request, Response
+
+from cache import etag_matches
+
+try:
+    import brotli
+except ImportError:  # optional dependency
+    brotli = None
+
+IMMUTABLE_CACHE_CONTROL = "public, max-age=31536000, immutable"
+REVALIDATE_CACHE_CONTROL = "no-cache"
+MIN_COMPRESS_BYTES = 512
+
+# href="style.css?v=..." / src="script.js" in the HTML pages
+ASSET_REFERENCE = re.compile(r'(href|src)="/?([\w.-]+\.(?:css|js))(?:\?[^"]*)?"')
+
+
+class StaticAsset(NamedTuple):
+    media_type: str
+    body: bytes
+    gzip: Optional[bytes]
+    brotli: Optional[bytes]
+    etag: str
+    last_modified: str
+    mtime: int
+
+
+def compress(body: bytes):
+    """Pre-compressed variants, or None where compression doesn't pay off."""
+    if len(body) < MIN_COMPRESS_BYTES:
+        return None, None
+    gz = gzip.compress(body, compresslevel=9, mtime=0)
+    br = brotli.compress(body, quality=11) if brotli is not None else None
+    return (
+        gz if len(gz) < len(body) else None,
+        br if br is not None and len(br) < len(body) else None,
+    )
+
+
+def make_asset(body: bytes, media_type: str, mtime: float) -> StaticAsset:
+    gz, br = compress(body)
+    digest = hashlib.blake2b(body, digest_size=16).hexdigest()
+    return StaticAsset(
+        media_type=media_type,
+        body=body,
+        gzip=gz,
+        brotli=br,
+        etag=f'"{digest}"',
+        last_modified=formatdate(int(mtime), usegmt=True),
+        mtime=int(mtime),
+    )
+
+
+def not_modified(request: Request, etag: str, mtime: float) -> bool:
+    """Conditional GET check: If-None-Match against etag, else If-Modified-Since against mtime."""
+    if_none_match = request.headers.get("if-none-match")
+    if if_none_match is not None:
+        # If-None-Match wins over If-Modified-Since
+        return etag_matches(if_none_match, etag)
+    if_modified_since = request.headers.get("if-modified-since")
+    if if_modified_since:
+        try:
+            return int(mtime) <= parsedate_to_datetime(if_modified_since).timestamp()
+        except (TypeError, ValueError):
+            return False
+    return False
+
+
+class AssetStore:
+    """In-memory frontend assets with hashed URLs and content negotiation."""
+
+    def __init__(self, root: str):
+        self.root = root
+        self.assets: Dict[str, StaticAsset] = {}
+        # plain name -> /assets/<hashed name>
+        self.hashed_urls: Dict[str, str] = {}
+        # hashed name -> plain name
+        self.hashed_names: Dict[str, str] = {}
+
+    def load_asset(self, name: str, media_type: str) -> StaticAsset:
+        """Load a stylesheet/script and publish it under its content-hashed name."""
+        path = os.path.join(self.root, name)
+        with open(path, "rb") as f:
+            asset = make_asset(f.read(), media_type, os.path.getmtime(path))
+        stem, ext = os.path.splitext(name)
+        digest = asset.etag.strip('"')
+        hashed = f"{stem}.{digest[:12]}{ext}"
+        self.assets[name] = asset
+        self.hashed_urls[name] = f"/assets/{hashed}"
+        self.hashed_names[hashed] = name
+        return asset
+
+    def load_page(self, name: str) -> StaticAsset:
+        """Load an HTML page, pointing its stylesheet/script references at the hashed URLs."""
+        path = os.path.join(self.root, name)
+        with open(path, "r", encoding="utf-8") as f:
+            html = f.read()
+
+        def rewrite(match):
+            url = self.hashed_urls.get(match.group(2))
+            return f'{match.group(1)}="{url}"' if url else match.group(0)
+
+        html = ASSET_REFERENCE.sub(rewrite, html)
+        # The page changes whenever an asset it references changes
+        mtime = max([os.path.getmtime(path)] + [self.assets[plain].mtime for plain in self.hashed_urls])
+        asset = make_asset(html.encode("utf-8"), "text/html", mtime)
+        self.assets[name] = asset
+        return asset
+
+    def response(self, request: Request, name: str, immutable: bool = False) -> Response:
+        asset = self.assets[name]
+        accept_encoding = request.headers.get("accept-encoding", "")
+        body, encoding, etag = asset.body, None, asset.etag
+        if asset.brotli is not None and "br" in accept_encoding:
+            body, encoding, etag = asset.brotli, "br", asset.etag[:-1] + '-br"'
+        elif asset.gzip is not None and "gzip" in accept_encoding:
+            body, encoding, etag = asset.gzip, "gzip", asset.etag[:-1] + '-gz"'
+
+        headers = {
+            "ETag": etag,
+            "Last-Modified": asset.last_modified,
+            "Cache-Control": IMMUTABLE_CACHE_CONTROL if immutable else REVALIDATE_CACHE_CONTROL,
+            "Vary": "Accept-Encoding",
+        }
+        if not_modified(request, etag, asset.mtime):
+            return Response(status_code=304, headers=headers)
+        if encoding:
+            headers["Content-Encoding"] = encoding
+        return Response(content=body, media_type=asset.media_type, headers=headers)
@@ -0,0 +1,205 @@
+"""
+Write-behind queue for append-only inserts (AI conversations, comments).
+
+Handlers enqueue an INSERT and either forget about it (ai_conversations) or
+await its row id (comments). A single writer thread, on its own connection,
+drains the queue and commits whole batches with executemany, so a burst of requests pays for one
+transaction and one fsync instead of one each. The queue is bounded: when
+it is full, submit() fails immediately (503) instead of buffering without
+limit. stop() flushes everything still queued before returning.
+
+A request that is cancelled before its row is written (client gone) is
+dropped from the batch. Errors only fail the futures of the batch they hit;
+the writer thread keeps running.
+"""
+import asyncio
+import os
+import queue
+import sqlite3
+import threading
+import time
+from collections import deque
+from concurrent.futures import Future
+
+from db import LATENCY_SAMPLES, DBOverloaded, percentiles
+
+WRITE_BATCH_SIZE = int(os.getenv("WRITE_BATCH_SIZE", "200"))  # max rows per transaction
+WRITE_FLUSH_INTERVAL = float(os.getenv("WRITE_FLUSH_INTERVAL", "0.02"))  # seconds to gather a batch
+WRITE_QUEUE_SIZE = int(os.getenv("WRITE_QUEUE_SIZE", "10000"))
+
+_STOP = object()
+
+
+class WriteQueueFull(DBOverloaded):
+    """Raised when the write-behind queue has no room left."""
+
+
+class WriteBehindQueue:
+    """Batches INSERTs from many requests into few transactions on one writer thread."""
+
+    def __init__(self, connect, batch_size: int = WRITE_BATCH_SIZE,
+                 flush_interval: float = WRITE_FLUSH_INTERVAL, max_queue: int = WRITE_QUEUE_SIZE):
+        self.connect = connect
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.max_queue = max_queue
+        self._queue = queue.Queue(maxsize=max_queue)
+        self._thread = None
+        self._conn = None  # owned by the writer thread
+        self._lock = threading.Lock()
+        self._stopped = False
+        # Metrics
+        self.rows_written = 0
+        self.rows_failed = 0
+        self.batches = 0
+        self.rejected = 0
+        self._flush_times = deque(maxlen=LATENCY_SAMPLES)
+
+    def start(self) -> None:
+        with self._lock:
+            if self._thread is None and not self._stopped:
+                self._thread = threading.Thread(target=self._run, name="db-writer", daemon=True)
+                self._thread.start()
+
+    def submit(self, sql: str, params: tuple) -> Future:
+        """Queue one INSERT; the returned future resolves to its row id once committed."""
+        if self._thread is None:
+            self.start()
+        if self._stopped:
+            raise WriteQueueFull("Write queue is shut down")
+        future = Future()
+        try:
+            self._queue.put_nowait((sql, params, future))
+        except queue.Full:
+            self.rejected += 1
+            raise WriteQueueFull(f"Write queue full ({self.max_queue} rows pending)")
+        return future
+
+    async def write(self, sql: str, params: tuple) -> int:
+        """Queue one INSERT and wait until its batch is committed; returns the row id."""
+        return await asyncio.wrap_future(self.submit(sql, params))
+
+    def stop(self, timeout: float = 30.0) -> None:
+        """Flush everything queued so far, then stop the writer thread."""
+        with self._lock:
+            self._stopped = True
+            thread = self._thread
+        if thread is not None:
+            self._queue.put(_STOP)
+            thread.join(timeout)
+
+    def _run(self) -> None:
+        try:
+            self._drain()
+        finally:
+            self._close_connection()
+
+    def _connection(self):
+        if self._conn is None:
+            self._conn = self.connect()
+        return self._conn
+
+    def _close_connection(self) -> None:
+        conn, self._conn = self._conn, None
+        if conn is not None:
+            try:
+                conn.close()
+            except sqlite3.Error:
+                pass
+
+    def _drain(self) -> None:
+        while True:
+            item = self._queue.get()
+            if item is _STOP:
+                return
+            batch = [item]
+            deadline = time.monotonic() + self.flush_interval
+            stop = False
+            while len(batch) < self.batch_size:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                try:
+                    item = self._queue.get(timeout=remaining)
+                except queue.Empty:
+                    break
+                if item is _STOP:
+                    stop = True
+                    break
+                batch.append(item)
+            self._flush(batch)
+            if stop:
+                # Drain whatever was queued behind the stop marker too
+                while True:
+                    try:
+                        item = self._queue.get_nowait()
+                    except queue.Empty:
+                        return
+                    if item is not _STOP:
+                        self._flush([item])
+
+    def _flush(self, batch) -> None:
+        started = time.perf_counter()
+        groups = {}
+        for sql, params, future in batch:
+            # Claim the future; one whose request was cancelled is dropped instead of written
+            if future.set_running_or_notify_cancel():
+                groups.setdefault(sql, []).append((params, future))
+        if not groups:
+            return
+
+        try:
+            conn = self._connection()
+            for sql, items in groups.items():
+                try:
+                    cursor = conn.cursor()
+                    cursor.executemany(sql, [params for params, _ in items])
+                    last_id = cursor.execute("SELECT last_insert_rowid()").fetchone()[0]
+                    conn.commit()
+                except sqlite3.Error:
+                    conn.rollback()
+                    self._write_one_by_one(conn, sql, items)
+                    continue
+                # AUTOINCREMENT ids of one executemany in one transaction are consecutive
+                first_id = last_id - len(items) + 1
+                for offset, (_, future) in enumerate(items):
+                    future.set_result(first_id + offset)
+                self.rows_written += len(items)
+        except Exception as exc:
+            # Connection trouble: fail what is left of this batch and reconnect for the next one
+            self._close_connection()
+            for items in groups.values():
+                for _, future in items:
+                    if not future.done():
+                        self.rows_failed += 1
+                        future.set_exception(exc)
+        self.batches += 1
+        self._flush_times.append(time.perf_counter() - started)
+
+    def _write_one_by_one(self, conn, sql: str, items) -> None:
+        """A batch failed: retry each row on its own so one bad row doesn't sink the rest."""
+        for params, future in items:
+            try:
+                cursor = conn.execute(sql, params)
+                conn.commit()
+            except sqlite3.Error as exc:
+                conn.rollback()
+                self.rows_failed += 1
+                future.set_exception(exc)
+            else:
+                self.rows_written += 1
+                future.set_result(cursor.lastrowid)
+
+    def stats(self) -> dict:
+        return {
+            "batch_size": self.batch_size,
+            "flush_interval_seconds": self.flush_interval,
+            "max_queue": self.max_queue,
+            "queue_depth": self._queue.qsize(),
+            "rows_written_total": self.rows_written,
+            "rows_failed_total": self.rows_failed,
+            "batches_total": self.batches,
+            "rows_per_batch_avg": round(self.rows_written / self.batches, 2) if self.batches else 0.0,
+            "rejected_total": self.rejected,
+            "flush_time": percentiles(list(self._flush_times)),
+        }
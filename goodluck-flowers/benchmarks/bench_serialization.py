@@ -0,0 +1,90 @@
+"""
+Micro-benchmark: JSON serialization of the big list endpoints.
+
+Builds a throwaway database with synthetic users, products and orders and
+times, for the queries behind /api/products, /api/orders and /api/users:
+
+  before  sqlite3.Row -> dict copy -> jsonable_encoder -> stdlib json
+          (FastAPI's default path for a handler returning a dict)
+  after   dict_cursor rows -> serialization.dumps (orjson when installed)
+
+Usage:
+    python bench_serialization.py [--users 5000] [--products 500] [--orders 20000] [--repeat 15]
+"""
+import argparse
+import contextlib
+import io
+import json
+import os
+import sqlite3
+import statistics
+import sys
+import tempfile
+import time
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.join(HERE, "../backend"))
+sys.path.insert(0, os.path.join(HERE, "../database"))
+
+from fastapi.encoders import jsonable_encoder  # noqa: E402
+
+from db import dict_cursor  # noqa: E402
+from init_db import init_database  # noqa: E402
+from main import ORDERS_QUERY, USERS_QUERY  # noqa: E402
+from serialization import dumps, orjson  # noqa: E402
+
+
+def before(conn, query, params, key):
+    conn.row_factory = sqlite3.Row
+    rows = [dict(row) for row in conn.execute(query, params)]
+    payload = jsonable_encoder({key: rows, "count": len(rows)})
+    return json.dumps(payload, ensure_ascii=False, allow_nan=False, indent=None, separators=(",", ":")).encode("utf-8")
+
+
+def after(conn, query, params, key):
+    rows = dict_cursor(conn).execute(query, params).fetchall()
+    return dumps({key: rows, "count": len(rows)})
+
+
+def timed(fn, repeat):
+    samples = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        body = fn()
+        samples.append(time.perf_counter() - start)
+    return statistics.median(samples) * 1000, len(body)
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--users", type=int, default=5000)
+    parser.add_argument("--products", type=int, default=500)
+    parser.add_argument("--orders", type=int, default=20000)
+    parser.add_argument("--repeat", type=int, default=15)
+    args = parser.parse_args()
+
+    endpoints = [
+        ("/api/products", "SELECT * FROM products", (), "products"),
+        ("/api/orders", ORDERS_QUERY, (0, -1), "orders"),
+        ("/api/users", USERS_QUERY, (0, -1), "users"),
+    ]
+
+    print(f"encoder: {'orjson ' + orjson.__version__ if orjson else 'stdlib json (orjson not installed)'}")
+    with tempfile.TemporaryDirectory() as tmp:
+        db_path = os.path.join(tmp, "bench.db")
+        with contextlib.redirect_stdout(io.StringIO()):
+            init_database(db_path, {"users": args.users, "products": args.products, "orders": args.orders})
+        conn = sqlite3.connect(db_path)
+
+        print(f"{'endpoint':<15} {'rows':>7} {'bytes':>10} {'before ms':>10} {'after ms':>10} {'speedup':>8}")
+        for path, query, params, key in endpoints:
+            rows = len(conn.execute(query, params).fetchall())
+            before_ms, size = timed(lambda: before(conn, query, params, key), args.repeat)
+            after_ms, _ = timed(lambda: after(conn, query, params, key), args.repeat)
+            print(f"{path:<15} {rows:>7} {size:>10} {before_ms:>10.2f} {after_ms:>10.2f} {before_ms / after_ms:>7.1f}x")
+        conn.close()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,395 @@
+"""
+Load test for the GoodLuck Flowers API.
+
+Seeds (or reuses) a synthetic database, starts a stub Ollama server and
+drives a weighted traffic mix against the app, either in-process through
+httpx's ASGI transport or against a local uvicorn started for the run.
+Each worker is a closed loop: send a request, read the whole body, repeat.
+
+The report lists, per endpoint, request count, RPS, p50/p95/p99 latency
+and status codes. --save-baseline writes the results as JSON and
+--compare checks a run against a saved baseline (exit code 1 when p95
+latency or RPS regressed by more than --threshold).
+
+Usage:
+    python load_test.py --preset small --duration 30 --concurrency 32
+    python load_test.py --db /tmp/bench.db --preset large --target uvicorn --workers 4
+    python load_test.py --db /tmp/bench.db --save-baseline baseline.json
+    python load_test.py --db /tmp/bench.db --compare baseline.json --threshold 0.15
+"""
+import argparse
+import asyncio
+import json
+import os
+import platform
+import random
+import sqlite3
+import subprocess
+import sys
+import tempfile
+import time
+from collections import Counter, defaultdict
+from typing import Dict, List, Optional
+
+import httpx
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+BACKEND_DIR = os.path.join(HERE, "../backend")
+
+import seed_data  # noqa: E402
+import stub_ollama  # noqa: E402
+
+IMAGE_FILES = [f"{name}.jpg" for name in seed_data.IMAGES]
+CHAT_PROMPTS = [
+    "Which flowers are best for a wedding?",
+    "How do I keep tulips fresh?",
+    "What do you recommend for a birthday?",
+    "Do you deliver on Sundays?",
+    "Which bouquet is the cheapest?",
+]
+
+
+class Stats:
+    """Latencies and status codes per endpoint, recorded after the warmup."""
+
+    def __init__(self):
+        self.latencies: Dict[str, List[float]] = defaultdict(list)
+        self.statuses: Dict[str, Counter] = defaultdict(Counter)
+        self.failures: Dict[str, int] = defaultdict(int)  # 2xx responses that report failure (e.g. bad login)
+        self.recording = False
+
+    def record(self, endpoint: str, seconds: float, status: str) -> None:
+        if self.recording:
+            self.latencies[endpoint].append(seconds)
+            self.statuses[endpoint][status] += 1
+
+    def fail(self, endpoint: str) -> None:
+        if self.recording:
+            self.failures[endpoint] += 1
+
+
+def percentile(sorted_values: List[float], fraction: float) -> float:
+    """Nearest-rank percentile of an already sorted list."""
+    if not sorted_values:
+        return 0.0
+    index = min(len(sorted_values) - 1, max(0, int(round(fraction * len(sorted_values))) - 1))
+    return sorted_values[index]
+
+
+def summarize(stats: Stats, elapsed: float) -> dict:
+    endpoints = {}
+    for endpoint in sorted(stats.latencies):
+        values = sorted(stats.latencies[endpoint])
+        statuses = stats.statuses[endpoint]
+        failed = stats.failures[endpoint]
+        endpoints[endpoint] = {
+            "count": len(values),
+            "rps": round(len(values) / elapsed, 2),
+            "p50_ms": round(percentile(values, 0.50) * 1000, 2),
+            "p95_ms": round(percentile(values, 0.95) * 1000, 2),
+            "p99_ms": round(percentile(values, 0.99) * 1000, 2),
+            "errors": failed + sum(count for status, count in statuses.items() if not status.startswith(("2", "3"))),
+            "failed": failed,
+            "statuses": dict(sorted(statuses.items())),
+        }
+    total = sum(len(values) for values in stats.latencies.values())
+    return {"elapsed_s": round(elapsed, 2), "total_requests": total, "total_rps": round(total / elapsed, 2),
+            "endpoints": endpoints}
+
+
+class Dataset:
+    """Id ranges of the seeded database, so generated requests hit existing rows."""
+
+    def __init__(self, db_path: str):
+        conn = sqlite3.connect(db_path)
+        self.max_product_id = conn.execute("SELECT MAX(id) FROM products").fetchone()[0]
+        self.max_order_id = conn.execute("SELECT MAX(id) FROM orders").fetchone()[0] or 0
+        self.customers = conn.execute(
+            "SELECT COUNT(*) FROM users WHERE username LIKE ?", (seed_data.SCALE_USERNAME.format("%"),)
+        ).fetchone()[0]
+        conn.close()
+        if not self.customers:
+            raise SystemExit(f"{db_path} has no generated users - seed it with seed_data.py or init_db.py --scale")
+
+
+class Worker:
+    """One simulated client; keeps its own session token like a browser tab would."""
+
+    def __init__(self, client: httpx.AsyncClient, data: Dataset, stats: Stats, shared: dict, seed_value: int):
+        self.client = client
+        self.data = data
+        self.stats = stats
+        self.shared = shared
+        self.rng = random.Random(seed_value)
+        self.token: Optional[str] = None
+
+    async def request(self, endpoint: str, method: str, url: str, **kwargs) -> Optional[httpx.Response]:
+        start = time.perf_counter()
+        try:
+            response = await self.client.request(method, url, **kwargs)
+            await response.aread()
+            status = str(response.status_code)
+        except httpx.HTTPError as exc:
+            response, status = None, type(exc).__name__
+        self.stats.record(endpoint, time.perf_counter() - start, status)
+        return response
+
+    def product_id(self) -> int:
+        return self.rng.randint(1, self.data.max_product_id)
+
+    def customer(self) -> int:
+        return self.rng.randint(1, self.data.customers)
+
+    def auth_headers(self) -> dict:
+        return {"Authorization": f"Bearer {self.token}"} if self.token else {}
+
+    async def browse_catalog(self):
+        # Browsers revalidate the (large) catalog with the ETag they already have
+        etag = self.shared.get("catalog_etag")
+        headers = {"If-None-Match": etag} if etag else {}
+        response = await self.request("GET /api/products", "GET", "/api/products", headers=headers)
+        if response is not None and response.status_code == 200:
+            self.shared["catalog_etag"] = response.headers.get("etag")
+
+    async def read_comments(self):
+        await self.request("GET /api/products/{id}/comments", "GET", f"/api/products/{self.product_id()}/comments")
+
+    async def post_comment(self):
+        await self.request("POST /api/products/{id}/comments", "POST", f"/api/products/{self.product_id()}/comments",
+                           json={"author_name": seed_data.SCALE_USERNAME.format(self.customer()),
+                                 "comment_text": self.rng.choice(seed_data.COMMENT_TEXTS)})
+
+    async def search(self):
+        await self.request("GET /api/search", "GET", "/api/search",
+                           params={"q": self.rng.choice(seed_data.SEARCH_TERMS), "limit": 20})
+
+    async def login(self):
+        customer = self.customer()
+        response = await self.request("POST /api/auth/login", "POST", "/api/auth/login",
+                                      json={"username": seed_data.SCALE_USERNAME.format(customer),
+                                            "password": seed_data.SCALE_PASSWORD.format(customer)})
+        if response is None or response.status_code != 200:
+            return
+        data = response.json()
+        if data.get("success"):
+            self.token = data["user"]["token"]
+        else:
+            self.stats.fail("POST /api/auth/login")
+
+    async def order(self):
+        await self.request("POST /api/orders", "POST", "/api/orders", headers=self.auth_headers(),
+                           json={"product_id": self.product_id(), "quantity": self.rng.randint(1, 3),
+                                 "credit_card": "4111111111111111", "cvv": "123"})
+
+    async def batch_order(self):
+        items = [{"product_id": self.product_id(), "quantity": self.rng.randint(1, 3)}
+                 for _ in range(self.rng.randint(2, 5))]
+        await self.request("POST /api/orders/batch", "POST", "/api/orders/batch", headers=self.auth_headers(),
+                           json={"items": items, "credit_card": "4111111111111111", "cvv": "123"})
+
+    async def list_orders(self):
+        after_id = self.rng.randint(0, max(0, self.data.max_order_id - 100))
+        await self.request("GET /api/orders", "GET", "/api/orders", params={"limit": 100, "after_id": after_id})
+
+    async def chat(self):
+        # A few repeated prompts (cache hits) mixed with unique ones (model calls)
+        if self.rng.random() < 0.5:
+            message = self.rng.choice(CHAT_PROMPTS)
+        else:
+            message = f"Tell me about {self.rng.choice(seed_data.FLOWERS)} bouquet {self.rng.randint(1, 10**6)}"
+        await self.request("POST /api/ai/chat", "POST", "/api/ai/chat", json={"message": message})
+
+    async def image(self):
+        await self.request("GET /images/{filename}", "GET", f"/images/{self.rng.choice(IMAGE_FILES)}",
+                           params={"w": 320, "format": "auto"}, headers={"Accept": "image/webp,*/*"})
+
+    # (scenario, weight) - roughly a storefront: mostly reads, some writes, a little AI chat
+    MIX = (
+        (browse_catalog, 15),
+        (read_comments, 25),
+        (post_comment, 5),
+        (search, 15),
+        (login, 8),
+        (order, 8),
+        (batch_order, 3),
+        (list_orders, 6),
+        (chat, 5),
+        (image, 10),
+    )
+
+    async def run(self, deadline: float):
+        scenarios = [scenario for scenario, _ in self.MIX]
+        weights = [weight for _, weight in self.MIX]
+        while time.perf_counter() < deadline:
+            scenario = self.rng.choices(scenarios, weights)[0]
+            await scenario(self)
+
+
+async def drive(client: httpx.AsyncClient, data: Dataset, args) -> dict:
+    stats = Stats()
+    shared: dict = {}
+    start = time.perf_counter()
+    deadline = start + args.warmup + args.duration
+
+    async def start_recording():
+        await asyncio.sleep(args.warmup)
+        stats.recording = True
+        return time.perf_counter()
+
+    recorder = asyncio.create_task(start_recording())
+    workers = [Worker(client, data, stats, shared, args.seed + index) for index in range(args.concurrency)]
+    await asyncio.gather(*(worker.run(deadline) for worker in workers))
+    recording_started = await recorder
+    return summarize(stats, time.perf_counter() - recording_started)
+
+
+def client_limits(concurrency: int) -> httpx.Limits:
+    return httpx.Limits(max_connections=concurrency, max_keepalive_connections=concurrency)
+
+
+async def run_inprocess(data: Dataset, args) -> dict:
+    sys.path.insert(0, BACKEND_DIR)
+    import main  # noqa: E402 - imported late so DB_PATH / OLLAMA_BASE_URL are already set
+
+    await main.app.router.startup()
+    try:
+        transport = httpx.ASGITransport(app=main.app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://bench", timeout=60) as client:
+            return await drive(client, data, args)
+    finally:
+        await main.app.router.shutdown()
+
+
+async def wait_until_healthy(base_url: str, process: subprocess.Popen, timeout: float = 60) -> None:
+    deadline = time.perf_counter() + timeout
+    async with httpx.AsyncClient(base_url=base_url, timeout=2) as client:
+        while time.perf_counter() < deadline:
+            if process.poll() is not None:
+                raise SystemExit(f"uvicorn exited with code {process.returncode}")
+            try:
+                if (await client.get("/api/health")).status_code == 200:
+                    return
+            except httpx.HTTPError:
+                pass
+            await asyncio.sleep(0.2)
+    raise SystemExit("uvicorn did not become healthy in time")
+
+
+async def run_uvicorn(data: Dataset, args) -> dict:
+    command = [sys.executable, "-m", "uvicorn", "main:app", "--host", "127.0.0.1", "--port", str(args.port),
+               "--workers", str(args.workers), "--log-level", "warning", "--no-access-log"]
+    process = subprocess.Popen(command, cwd=BACKEND_DIR, env=os.environ.copy(),
+                               stdout=subprocess.DEVNULL, stderr=None if args.verbose else subprocess.DEVNULL)
+    base_url = f"http://127.0.0.1:{args.port}"
+    try:
+        await wait_until_healthy(base_url, process)
+        async with httpx.AsyncClient(base_url=base_url, timeout=60, limits=client_limits(args.concurrency)) as client:
+            return await drive(client, data, args)
+    finally:
+        process.terminate()
+        try:
+            process.wait(timeout=15)
+        except subprocess.TimeoutExpired:
+            process.kill()
+
+
+def print_report(result: dict) -> None:
+    print(f"\n{'endpoint':<36} {'count':>7} {'rps':>8} {'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8}  statuses")
+    for endpoint, row in result["endpoints"].items():
+        statuses = " ".join(f"{status}:{count}" for status, count in row["statuses"].items())
+        if row.get("failed"):
+            statuses += f" failed:{row['failed']}"
+        print(f"{endpoint:<36} {row['count']:>7} {row['rps']:>8.1f} {row['p50_ms']:>8.1f} "
+              f"{row['p95_ms']:>8.1f} {row['p99_ms']:>8.1f}  {statuses}")
+    print(f"{'total':<36} {result['total_requests']:>7} {result['total_rps']:>8.1f}")
+
+
+def compare(result: dict, baseline: dict, threshold: float) -> List[str]:
+    """Endpoints whose p95 grew or whose RPS dropped by more than threshold (a fraction)."""
+    regressions = []
+    print(f"\n{'endpoint':<36} {'p95 base':>9} {'p95 now':>9} {'rps base':>9} {'rps now':>9}")
+    for endpoint, now in result["endpoints"].items():
+        base = baseline["endpoints"].get(endpoint)
+        if base is None:
+            continue
+        print(f"{endpoint:<36} {base['p95_ms']:>9.1f} {now['p95_ms']:>9.1f} {base['rps']:>9.1f} {now['rps']:>9.1f}")
+        if base["p95_ms"] and now["p95_ms"] > base["p95_ms"] * (1 + threshold):
+            regressions.append(f"{endpoint}: p95 {base['p95_ms']}ms -> {now['p95_ms']}ms")
+        if base["rps"] and now["rps"] < base["rps"] * (1 - threshold):
+            regressions.append(f"{endpoint}: rps {base['rps']} -> {now['rps']}")
+    return regressions
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="Load test for the GoodLuck Flowers API")
+    parser.add_argument("--db", help="benchmark database (seeded with --preset if it does not exist yet)")
+    parser.add_argument("--preset", choices=sorted(seed_data.PRESETS), default="small")
+    parser.add_argument("--target", choices=["inprocess", "uvicorn"], default="inprocess")
+    parser.add_argument("--port", type=int, default=8099, help="uvicorn port")
+    parser.add_argument("--workers", type=int, default=1, help="uvicorn worker processes")
+    parser.add_argument("--concurrency", type=int, default=32, help="simulated clients")
+    parser.add_argument("--duration", type=float, default=30, help="measured seconds")
+    parser.add_argument("--warmup", type=float, default=5, help="seconds before measuring starts")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--ollama-port", type=int, default=11435)
+    parser.add_argument("--ollama-delay", type=float, default=0.2, help="stub Ollama seconds per generation")
+    parser.add_argument("--save-baseline", metavar="FILE")
+    parser.add_argument("--compare", metavar="FILE", help="baseline JSON to compare against")
+    parser.add_argument("--threshold", type=float, default=0.2, help="allowed p95/RPS regression (0.2 = 20%%)")
+    parser.add_argument("--verbose", action="store_true", help="show server logs")
+    args = parser.parse_args()
+
+    tmp = None
+    db_path = args.db
+    if db_path is None:
+        tmp = tempfile.TemporaryDirectory()
+        db_path = os.path.join(tmp.name, "bench.db")
+    if not os.path.exists(db_path):
+        print(f"🌱 Seeding {db_path} ({args.preset})...")
+        print(f"   {seed_data.seed(db_path, seed_data.PRESETS[args.preset], args.seed)}")
+    data = Dataset(db_path)
+
+    ollama_server = stub_ollama.start(args.ollama_port, args.ollama_delay)
+    os.environ.update({
+        "DB_PATH": os.path.abspath(db_path),
+        "OLLAMA_BASE_URL": f"http://127.0.0.1:{args.ollama_port}",
+        "LOG_LEVEL": "DEBUG" if args.verbose else "WARNING",
+    })
+
+    print(f"🚀 {args.target}: {args.concurrency} clients, {args.warmup:g}s warmup + {args.duration:g}s")
+    try:
+        runner = run_inprocess if args.target == "inprocess" else run_uvicorn
+        result = asyncio.run(runner(data, args))
+    finally:
+        ollama_server.shutdown()
+        if tmp is not None:
+            tmp.cleanup()
+
+    result["meta"] = {
+        "target": args.target, "workers": args.workers, "concurrency": args.concurrency,
+        "duration_s": args.duration, "db": os.path.basename(db_path), "python": platform.python_version(),
+        "max_product_id": data.max_product_id, "max_order_id": data.max_order_id,
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+    }
+    print_report(result)
+
+    if args.save_baseline:
+        with open(args.save_baseline, "w") as f:
+            json.dump(result, f, indent=2)
+        print(f"\n💾 Baseline saved to {args.save_baseline}")
+
+    if args.compare:
+        with open(args.compare) as f:
+            baseline = json.load(f)
+        regressions = compare(result, baseline, args.threshold)
+        if regressions:
+            print(f"\n❌ {len(regressions)} regression(s) beyond {args.threshold:.0%}:")
+            for line in regressions:
+                print(f"   {line}")
+            return 1
+        print(f"\n✅ No regressions beyond {args.threshold:.0%}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
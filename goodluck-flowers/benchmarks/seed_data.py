@@ -0,0 +1,60 @@
+"""
+Synthetic dataset for the load tests.
+
+Creates a fresh database with database/init_db.py and its synthetic data
+generator (the same one behind `init_db.py --scale`), using fixed row
+counts per preset. Same preset and --seed give the same rows.
+
+Generated users log in as customer<N> / pw<N>.
+
+Usage:
+    python seed_data.py bench.db --preset large
+    python seed_data.py bench.db --users 20000 --products 5000 --orders 200000 --comments 100000
+"""
+import argparse
+import contextlib
+import io
+import os
+import sys
+import time
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.join(HERE, "../database"))
+
+from init_db import (  # noqa: E402
+    ADJECTIVES, COMMENT_TEXTS, FLOWERS, IMAGES, SCALE_PASSWORD, SCALE_ROWS, SCALE_USERNAME, STYLES, init_database,
+)
+
+PRESETS = {
+    "small": {"users": 2_000, "products": 1_000, "orders": 20_000, "sessions": 1_000, "comments": 3_000},
+    "medium": {"users": 20_000, "products": 10_000, "orders": 200_000, "sessions": 10_000, "comments": 50_000},
+    "large": {"users": 100_000, "products": 100_000, "orders": 1_000_000, "sessions": 50_000, "comments": 1_000_000},
+}
+
+SEARCH_TERMS = [name.lower() for name in FLOWERS + STYLES] + ADJECTIVES
+
+
+def seed(db_path: str, counts: dict, seed_value: int = 42) -> dict:
+    started = time.perf_counter()
+    with contextlib.redirect_stdout(io.StringIO()):
+        init_database(db_path, counts, seed_value)
+    return dict(counts, seconds=round(time.perf_counter() - started, 1))
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="Seed a synthetic GoodLuck Flowers database")
+    parser.add_argument("db_path")
+    parser.add_argument("--preset", choices=sorted(PRESETS), default="small")
+    for table in SCALE_ROWS:
+        parser.add_argument(f"--{table}", type=int, help=f"override the preset's {table} count")
+    parser.add_argument("--seed", type=int, default=42)
+    args = parser.parse_args()
+
+    counts = {table: getattr(args, table) if getattr(args, table) is not None else rows
+              for table, rows in PRESETS[args.preset].items()}
+    print(f"✅ Seeded {args.db_path}: {seed(args.db_path, counts, args.seed)}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
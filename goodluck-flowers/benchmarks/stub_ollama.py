@@ -0,0 +1,97 @@
+"""
+Minimal stand-in for the Ollama REST API, used by the load tests.
+
+Answers GET /api/tags with the models the backend looks for and
+POST /api/generate with a canned reply after a fixed delay (NDJSON chunks
+when "stream" is true), so /api/ai/chat can be measured without a GPU.
+
+Usage:
+    python stub_ollama.py [--port 11435] [--delay 0.2]
+"""
+import argparse
+import json
+import sys
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+MODELS = ["goodluck-flowers-vulnerable:latest", "llama3:latest"]
+REPLY = ["Roses ", "are ", "our ", "best ", "sellers ", "this ", "week. ", "Order ", "today!"]
+
+
+def make_handler(delay: float):
+    class StubOllamaHandler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+
+        def log_message(self, format, *args):
+            pass
+
+        def send_json(self, payload: dict, status: int = 200):
+            body = json.dumps(payload).encode("utf-8")
+            self.send_response(status)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def do_GET(self):
+            if self.path == "/api/tags":
+                self.send_json({"models": [{"name": name} for name in MODELS]})
+            else:
+                self.send_json({"error": "not found"}, 404)
+
+        def do_POST(self):
+            length = int(self.headers.get("Content-Length", 0))
+            request = json.loads(self.rfile.read(length) or b"{}")
+            if self.path != "/api/generate":
+                self.send_json({"error": "not found"}, 404)
+                return
+            model = request.get("model", MODELS[0])
+            if not request.get("prompt"):
+                # Model preload request
+                self.send_json({"model": model, "response": "", "done": True})
+                return
+
+            if not request.get("stream"):
+                time.sleep(delay)
+                self.send_json({"model": model, "response": "".join(REPLY), "done": True})
+                return
+
+            self.send_response(200)
+            self.send_header("Content-Type", "application/x-ndjson")
+            self.send_header("Transfer-Encoding", "chunked")
+            self.end_headers()
+            for index, word in enumerate(REPLY + [""]):
+                time.sleep(delay / (len(REPLY) + 1))
+                line = (json.dumps({"model": model, "response": word, "done": index == len(REPLY)}) + "\n").encode()
+                self.wfile.write(b"%x\r\n%s\r\n" % (len(line), line))
+                self.wfile.flush()
+            self.wfile.write(b"0\r\n\r\n")
+
+    return StubOllamaHandler
+
+
+def start(port: int, delay: float) -> ThreadingHTTPServer:
+    """Serve in a daemon thread; call .shutdown() on the result to stop."""
+    server = ThreadingHTTPServer(("127.0.0.1", port), make_handler(delay))
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="Stub Ollama server for load tests")
+    parser.add_argument("--port", type=int, default=11435)
+    parser.add_argument("--delay", type=float, default=0.2, help="seconds per generation")
+    args = parser.parse_args()
+    server = ThreadingHTTPServer(("127.0.0.1", args.port), make_handler(args.delay))
+    print(f"🤖 Stub Ollama on http://127.0.0.1:{args.port} ({args.delay}s per generation)")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
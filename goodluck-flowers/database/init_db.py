@@ -1,21 +1,174 @@
+import argparse
 import sqlite3
 import hashlib
 import os
+import random
+import time
+from collections import defaultdict
+from datetime import date, datetime, timedelta, timezone
 
 # Database path
 DB_PATH = os.path.join(os.path.dirname(__file__), 'flowers.db')
 
-def init_database():
-    """Initialize the database with tables and seed data"""
+# Synthetic rows per unit of --scale (--scale 1 = 1M orders, --scale 0.01 for a quick run)
+SCALE_ROWS = {
+    'users': 100_000,
+    'products': 20_000,
+    'orders': 1_000_000,
+    'sessions': 50_000,
+    'comments': 500_000,
+}
+
+# Generated users log in as customer<N> / pw<N>
+SCALE_USERNAME = 'customer{}'
+SCALE_PASSWORD = 'pw{}'
+
+FLOWERS = ['Rose', 'Tulip', 'Orchid', 'Sunflower', 'Lily', 'Peony', 'Daisy', 'Carnation', 'Iris', 'Dahlia',
+           'Lavender', 'Magnolia', 'Gardenia', 'Hydrangea', 'Freesia', 'Ranunculus', 'Anemone', 'Camellia']
+STYLES = ['Elegance', 'Dreams', 'Paradise', 'Joy', 'Garden', 'Bliss', 'Delight', 'Bouquet', 'Basket',
+          'Sunrise', 'Classic', 'Deluxe', 'Wild', 'Pastel', 'Royal', 'Meadow']
+ADJECTIVES = ['fragrant', 'colorful', 'hand-tied', 'seasonal', 'exotic', 'romantic', 'cheerful', 'elegant']
+IMAGES = ['roses', 'tulips', 'orchids', 'sunflowers', 'lilies', 'peonies', 'daisies', 'mixed']
+COMMENT_TEXTS = [
+    'Arrived fresh and lasted two weeks!',
+    'Beautiful colors, exactly like the picture.',
+    'Delivery was late but the flowers were lovely.',
+    "Perfect for my mother's birthday.",
+    'A bit smaller than expected.',
+    'Absolutely stunning arrangement, will order again.',
+]
+# The fake cards from the README (VULNERABILITY: stored in plaintext like real orders)
+CARDS = [('4532-1234-5678-9010', '123'), ('5425-2334-5566-7788', '456')]
+
+def scaled_counts(scale):
+    """Synthetic row counts for a --scale factor"""
+    return {table: int(rows * scale) for table, rows in SCALE_ROWS.items()}
+
+def timestamps(as_of, days=365):
+    """One 'YYYY-MM-DD HH:MM:SS' per hour over the days before as_of (UTC, like CURRENT_TIMESTAMP)"""
+    end = datetime.combine(as_of, datetime.min.time()) + timedelta(days=1)
+    return [(end - timedelta(hours=hour)).strftime('%Y-%m-%d %H:%M:%S') for hour in range(days * 24, 0, -1)]
+
+def generate_users(rng, count, stamps):
+    for n in range(1, count + 1):
+        yield (SCALE_USERNAME.format(n), SCALE_PASSWORD.format(n), f'customer{n}@example.com', 'user',
+               stamps[int(rng.random() * len(stamps))])
+
+def generate_products(rng, count, stamps, prices):
+    """Products rows; appends each price to prices (indexed by product id) for the orders"""
+    choice = rng.choice
+    for n in range(1, count + 1):
+        flower = choice(FLOWERS)
+        price = round(9 + rng.random() * 190, 2)
+        prices.append(price)
+        yield (f'{flower} {choice(STYLES)} {n}',
+               f'{choice(ADJECTIVES).capitalize()} {flower.lower()}s with {choice(ADJECTIVES)} {choice(FLOWERS).lower()} accents',
+               price, f'/images/{choice(IMAGES)}.jpg', 50 + int(rng.random() * 950),
+               stamps[int(rng.random() * len(stamps))])
+
+def generate_orders(rng, count, stamps, prices, user_count, totals):
+    """Orders rows; adds each order to totals (order_stats / revenue_by_* rows, like record_order_stats)"""
+    random_ = rng.random
+    product_count = len(prices) - 1
+    by_product, by_user, by_day = totals
+    for _ in range(count):
+        product_id = 1 + int(random_() * product_count)
+        quantity = 1 + int(random_() * 5)
+        card, cvv = CARDS[int(random_() * len(CARDS))]
+        # ~10% guest checkouts (aggregated under user_id 0)
+        user_id = 1 + int(random_() * user_count) if random_() >= 0.1 else None
+        total_price = round(prices[product_id] * quantity, 2)
+        order_date = stamps[int(random_() * len(stamps))]
+        for total in (by_product[product_id], by_user[user_id or 0], by_day[order_date[:10]]):
+            total[0] += 1
+            total[1] += quantity
+            total[2] += total_price
+        yield (user_id, product_id, quantity, total_price, card, cvv, order_date)
+
+def generate_sessions(rng, count, stamps, user_count):
+    # Same predictable token format the login endpoint issues (one session per user)
+    for user_id in sorted(rng.sample(range(1, user_count + 1), min(count, user_count))):
+        yield (user_id, f'weak-session-{user_id}', stamps[int(rng.random() * len(stamps))])
+
+def generate_comments(rng, count, stamps, product_count, user_count):
+    random_ = rng.random
+    for _ in range(count):
+        yield (1 + int(random_() * product_count), SCALE_USERNAME.format(1 + int(random_() * user_count)),
+               COMMENT_TEXTS[int(random_() * len(COMMENT_TEXTS))], stamps[int(random_() * len(stamps))])
+
+def load_synthetic_data(cursor, counts, seed, as_of):
+    """Stream generated rows into the (index- and trigger-free) tables"""
+    # One generator per table, so e.g. more orders don't change the generated users
+    rng = {table: random.Random(f'{seed}:{table}') for table in SCALE_ROWS}
+    stamps = timestamps(as_of)
+
+    cursor.execute('SELECT id, price FROM products ORDER BY id')
+    prices = [0.0] + [price for _, price in cursor.fetchall()]
+    base_users = cursor.execute('SELECT COUNT(*) FROM users').fetchone()[0]
+
+    cursor.executemany(
+        'INSERT INTO users (username, password, email, role, created_at) VALUES (?, ?, ?, ?, ?)',
+        generate_users(rng['users'], counts['users'], stamps)
+    )
+    cursor.executemany(
+        'INSERT INTO products (name, description, price, image_url, stock, created_at) VALUES (?, ?, ?, ?, ?, ?)',
+        generate_products(rng['products'], counts['products'], stamps, prices)
+    )
+    user_count = base_users + counts['users']
+    totals = tuple(defaultdict(lambda: [0, 0, 0.0]) for _ in range(3))
+    cursor.executemany(
+        'INSERT INTO orders (user_id, product_id, quantity, total_price, credit_card, cvv, order_date) '
+        'VALUES (?, ?, ?, ?, ?, ?, ?)',
+        generate_orders(rng['orders'], counts['orders'], stamps, prices, user_count, totals)
+    )
+    # Aggregates summed while generating - cheaper than GROUP BY passes over millions of orders
+    for table, key, rows in zip(('revenue_by_product', 'revenue_by_user', 'revenue_by_day'),
+                                ('product_id', 'user_id', 'day'), totals):
+        cursor.executemany(
+            f'INSERT INTO {table} ({key}, order_count, items_sold, revenue) VALUES (?, ?, ?, ?)',
+            ((key_value, *total) for key_value, total in sorted(rows.items()))
+        )
+    cursor.execute(
+        'UPDATE order_stats SET order_count = ?, items_sold = ?, revenue = ? WHERE id = 1',
+        [sum(total[column] for total in totals[0].values()) for column in range(3)]
+    )
+    cursor.executemany(
+        'INSERT INTO sessions (user_id, token, created_at) VALUES (?, ?, ?)',
+        generate_sessions(rng['sessions'], counts['sessions'], stamps, user_count)
+    )
+    cursor.executemany(
+        'INSERT INTO comments (product_id, author_name, comment_text, created_at) VALUES (?, ?, ?, ?)',
+        generate_comments(rng['comments'], counts['comments'], stamps, len(prices) - 1, user_count)
+    )
+
+def init_database(db_path=DB_PATH, counts=None, seed=42, as_of=None):
+    """Initialize the database with tables and seed data
+    
+    counts: synthetic rows to add per table (see scaled_counts); the tables
+    are bulk-loaded first and the FTS index, triggers and secondary indexes
+    are built afterwards. Same counts, seed and as_of give the same rows.
+    """
+    counts = {table: (counts or {}).get(table, 0) for table in SCALE_ROWS}
+    started = time.perf_counter()
     
     # Remove existing database
-    if os.path.exists(DB_PATH):
-        os.remove(DB_PATH)
+    if os.path.exists(db_path):
+        os.remove(db_path)
     
     # Create connection
-    conn = sqlite3.connect(DB_PATH)
+    conn = sqlite3.connect(db_path)
     cursor = conn.cursor()
     
+    # Bulk-load settings: a fresh file is simply recreated if the load fails,
+    # so skip the rollback journal and fsyncs
+    cursor.executescript('''
+        PRAGMA journal_mode = OFF;
+        PRAGMA synchronous = OFF;
+        PRAGMA locking_mode = EXCLUSIVE;
+        PRAGMA temp_store = MEMORY;
+        PRAGMA cache_size = -262144;
+    ''')
+    
     # Create users table
     cursor.execute('''
         CREATE TABLE users (
@@ -41,6 +194,18 @@ def init_database():
         )
     ''')
     
+    # Full-text index over products (external content - rows live in products)
+    cursor.execute('''
+        CREATE VIRTUAL TABLE products_fts USING fts5(
+            name,
+            description,
+            content='products',
+            content_rowid='id',
+            tokenize='unicode61 remove_diacritics 2',
+            prefix='2 3'
+        )
+    ''')
+    
     # Create orders table
     cursor.execute('''
         CREATE TABLE orders (
@@ -57,6 +222,36 @@ def init_database():
         )
     ''')
     
+    # Materialized order aggregates, updated in the same transaction as each order
+    # (guest orders are counted under user_id 0)
+    cursor.executescript('''
+        CREATE TABLE order_stats (
+            id INTEGER PRIMARY KEY CHECK (id = 1),
+            order_count INTEGER NOT NULL DEFAULT 0,
+            items_sold INTEGER NOT NULL DEFAULT 0,
+            revenue REAL NOT NULL DEFAULT 0
+        );
+        INSERT INTO order_stats (id) VALUES (1);
+        CREATE TABLE revenue_by_product (
+            product_id INTEGER PRIMARY KEY,
+            order_count INTEGER NOT NULL DEFAULT 0,
+            items_sold INTEGER NOT NULL DEFAULT 0,
+            revenue REAL NOT NULL DEFAULT 0
+        );
+        CREATE TABLE revenue_by_user (
+            user_id INTEGER PRIMARY KEY,
+            order_count INTEGER NOT NULL DEFAULT 0,
+            items_sold INTEGER NOT NULL DEFAULT 0,
+            revenue REAL NOT NULL DEFAULT 0
+        );
+        CREATE TABLE revenue_by_day (
+            day TEXT PRIMARY KEY,
+            order_count INTEGER NOT NULL DEFAULT 0,
+            items_sold INTEGER NOT NULL DEFAULT 0,
+            revenue REAL NOT NULL DEFAULT 0
+        );
+    ''')
+    
     # Create sessions table
     cursor.execute('''
         CREATE TABLE sessions (
@@ -75,6 +270,8 @@ def init_database():
             user_message TEXT NOT NULL,
             ai_response TEXT NOT NULL,
             user_ip TEXT,
+            model TEXT,
+            prompt_key TEXT,
             created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
         )
     ''')
@@ -123,14 +320,70 @@ def init_database():
         products
     )
     
+    if any(counts.values()):
+        load_synthetic_data(cursor, counts, seed, as_of or datetime.now(timezone.utc).date())
+    
+    # Full-text index built in one pass over products (faster than a trigger per row)
+    cursor.execute("INSERT INTO products_fts(products_fts) VALUES ('rebuild')")
+    
+    # Keep products_fts in sync with products
+    cursor.executescript('''
+        CREATE TRIGGER products_fts_insert AFTER INSERT ON products BEGIN
+            INSERT INTO products_fts(rowid, name, description)
+            VALUES (new.id, new.name, new.description);
+        END;
+        CREATE TRIGGER products_fts_delete AFTER DELETE ON products BEGIN
+            INSERT INTO products_fts(products_fts, rowid, name, description)
+            VALUES ('delete', old.id, old.name, old.description);
+        END;
+        CREATE TRIGGER products_fts_update AFTER UPDATE OF name, description ON products BEGIN
+            INSERT INTO products_fts(products_fts, rowid, name, description)
+            VALUES ('delete', old.id, old.name, old.description);
+            INSERT INTO products_fts(rowid, name, description)
+            VALUES (new.id, new.name, new.description);
+        END;
+    ''')
+    
+    # Secondary indexes for the hot backend queries
+    # (backend/check_query_plans.py fails if a query falls back to a full scan)
+    cursor.executescript('''
+        -- login: latest session of a user (covering: user_id, id, token); DELETE by user_id
+        CREATE INDEX idx_sessions_user ON sessions(user_id, id, token);
+        -- product comments newest first
+        CREATE INDEX idx_comments_product_created ON comments(product_id, created_at);
+        -- orders by customer / by product
+        CREATE INDEX idx_orders_user ON orders(user_id);
+        CREATE INDEX idx_orders_product ON orders(product_id);
+        -- AI answer cache lookups (normalized prompt + model, newest first)
+        CREATE INDEX idx_ai_conversations_prompt ON ai_conversations(prompt_key, model, created_at);
+    ''')
+    
     conn.commit()
+    if any(counts.values()):
+        # Planner statistics for the large tables
+        cursor.execute('ANALYZE')
+        conn.commit()
     conn.close()
     
-    print(f"✅ Database initialized successfully at {DB_PATH}")
+    print(f"✅ Database initialized successfully at {db_path}")
     print(f"📊 Created {len(users)} users and {len(products)} products")
+    if any(counts.values()):
+        generated = ', '.join(f"{rows:,} {table}" for table, rows in counts.items())
+        print(f"📦 Generated {generated} (seed {seed}) in {time.perf_counter() - started:.1f}s")
+        print(f"   Generated users log in as {SCALE_USERNAME.format('<N>')} / {SCALE_PASSWORD.format('<N>')}")
     print("\n🔐 Default accounts:")
     for username, password, _, role in users:
         print(f"   {role.upper()}: {username} / {password}")
 
+def main():
+    parser = argparse.ArgumentParser(description='Create the GoodLuck Flowers database')
+    parser.add_argument('--path', default=DB_PATH, help='database file (recreated)')
+    parser.add_argument('--scale', type=float, default=0,
+                        help='add synthetic data: 1.0 = ' + ', '.join(f'{rows:,} {table}' for table, rows in SCALE_ROWS.items()))
+    parser.add_argument('--seed', type=int, default=42, help='random seed for the synthetic data')
+    parser.add_argument('--as-of', type=date.fromisoformat, help='last day of generated timestamps (YYYY-MM-DD, default today)')
+    args = parser.parse_args()
+    init_database(args.path, scaled_counts(args.scale), args.seed, args.as_of)
+
 if __name__ == '__main__':
-    init_database()
+    main()
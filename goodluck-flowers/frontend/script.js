@@ -272,12 +272,20 @@ async function loadProducts() {
         const grid = document.getElementById('productsGrid');
         grid.innerHTML = data.products.map(product => {
             const encodedName = encodeURIComponent(product.name);
-            const imageUrl = product.image_url.startsWith('http') ? product.image_url : `${API_URL}${product.image_url}`;
+            const isLocalImage = !product.image_url.startsWith('http');
+            const imageUrl = isLocalImage ? `${API_URL}${product.image_url}` : product.image_url;
+            // Local images: let the browser pick a resized WebP/AVIF variant for the card width
+            const sep = imageUrl.includes('?') ? '&' : '?';
+            const imageSrc = isLocalImage ? `${imageUrl}${sep}w=480&format=auto` : imageUrl;
+            const imageSrcset = isLocalImage
+                ? [320, 480, 640, 960].map(w => `${imageUrl}${sep}w=${w}&format=auto ${w}w`).join(', ')
+                : '';
             return `
             <div class="product-card">
-                <img src="${imageUrl}" alt="${product.name}" class="product-image"
+                <img src="${imageSrc}" ${imageSrcset ? `srcset="${imageSrcset}" sizes="(max-width: 700px) 100vw, 400px"` : ''}
+                    loading="lazy" decoding="async" alt="${product.name}" class="product-image"
                     onload="this.classList.add('loaded')"
-                    onerror="this.onerror=null; this.src='https://via.placeholder.com/400x250?text=${encodedName}'; this.classList.add('loaded');">
+                    onerror="this.onerror=null; this.removeAttribute('srcset'); this.src='https://via.placeholder.com/400x250?text=${encodedName}'; this.classList.add('loaded');">
                 <div class="product-info">
                     <div class="product-name">${product.name}</div>
                     <div class="product-description">${product.description}</div>